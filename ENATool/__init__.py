@@ -25,16 +25,52 @@ __version__ = "2.0.0"
 __author__ = "P.Tikhonova"
 __email__ = "tikhonova.polly@mail.ru"
 
-from .extract_samples_info import get_samples_info_by_ena_prj_name
-from .safe_samples_downloader import download_samples
-from .api_urls import (
-    get_ena_filereport_url,
-    get_ena_sample_xml_url,
-    get_ncbi_biosample_url
-)
+import importlib
+import os
 
 import pandas as pd
-import os
+
+# Re-exports resolved on first access (PEP 562). Their modules pull in
+# requests, lxml and tqdm, which `import ENATool` and `enatool --help` never use.
+_LAZY_EXPORTS = {
+    'get_samples_info_by_ena_prj_name': 'extract_samples_info',
+    'download_samples': 'safe_samples_downloader',
+    'iter_download_samples': 'safe_samples_downloader',
+    'get_ena_filereport_url': 'api_urls',
+    'get_ena_search_url': 'api_urls',
+    'get_ena_sample_xml_url': 'api_urls',
+    'get_ncbi_biosample_url': 'api_urls',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LAZY_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
+# Columns that identify the table type handled by the `.ena` accessor
+_RAW_COLS = frozenset({'sample_accession', 'run_accession', 'fastq_ftp'})
+_READY_COLS = frozenset({'sample_name', 'accession', 'filepath', 'number_of_files'})
+
+# Marks an accessor whose table type has not been detected yet
+_UNSET = object()
+
+# Low-cardinality metadata columns stored as categoricals in fetched tables
+_CATEGORICAL_COLUMNS = (
+    'scientific_name',
+    'instrument_platform',
+    'library_strategy',
+    'library_layout',
+    'library_source',
+    'library_selection',
+    'center_name',
+)
 
 
 @pd.api.extensions.register_dataframe_accessor("ena")
@@ -51,25 +87,60 @@ class ENATool:
         table_type (str): Type of table ('raw' or 'ready')
     """
     
+    __slots__ = ('_obj', '_table_type', 'id', 'path')
+    
     def __init__(self, pandas_obj):
         self._obj = pandas_obj
-        self.table_type = None
-        
-        # Detect table type based on columns
-        if all(column in self._obj.columns for column in 
-               ['sample_accession', 'run_accession', 'fastq_ftp']):
-            self.table_type = 'raw'
-        if all(column in self._obj.columns for column in 
-               ['sample_name', 'accession', 'filepath', 'number_of_files']):
-            self.table_type = 'ready'
-        
+        self._table_type = _UNSET
         self.id = None
         self.path = None
+        
+        # Newer pandas builds a fresh accessor on every `df.ena` lookup, which
+        # would drop id/path between calls. Cache the instance on the frame so
+        # it shadows the accessor descriptor, as older pandas did itself.
+        object.__setattr__(pandas_obj, 'ena', self)
+    
+    @property
+    def table_type(self):
+        """Type of table ('raw', 'ready' or None), detected on first access."""
+        if self._table_type is _UNSET:
+            # Detect table type based on columns ('ready' wins if both match)
+            columns = frozenset(self._obj.columns)
+            if _READY_COLS <= columns:
+                self._table_type = 'ready'
+            elif _RAW_COLS <= columns:
+                self._table_type = 'raw'
+            else:
+                self._table_type = None
+        return self._table_type
+     
+    def _table_argument(self):
+        """Return the download_samples() keyword that matches this table type."""
+        if self.id is None:
+            raise ValueError(
+                'DataFrame.ena.id is None. Please set it:\n'
+                '  table.ena.id = "PRJNA335681"\n'
+                '  table.ena.path = "path/to/project"\n'
+                'or reinitialize from existing table:\n'
+                '  new_table.ena.reinit(old_table)'
+            )
+        
+        if self.table_type == 'raw':
+            return {'ena_sample_info_table': self._obj}
+        
+        if self.table_type == 'ready':
+            return {'downoad_info_table': self._obj}
+        
+        raise ValueError('Unable to detect table type. Check column names.')
      
-    def download(self, keep_failed, NO_PROGRESS_BAR):
+    def download(self, keep_failed, NO_PROGRESS_BAR, concurrency=None):
         """
         Download FASTQ files for samples in the DataFrame.
         
+        Args:
+            concurrency: Number of runs downloaded in parallel
+                (default: DOWNLOAD_CONCURRENCY, 4)
+        
         Returns:
             DataFrame with download status for each sample
             
@@ -80,45 +151,61 @@ class ENATool:
             >>> info_table = ENATool.fetch('PRJNA335681')
             >>> download_table = info_table.ena.download()
         """
-        if self.id is None:
-            raise ValueError(
-                'DataFrame.ena.id is None. Please set it:\n'
-                '  table.ena.id = "PRJNA335681"\n'
-                '  table.ena.path = "path/to/project"\n'
-                'or reinitialize from existing table:\n'
-                '  new_table.ena.reinit(old_table)'
-            )
+        from .safe_samples_downloader import download_samples, DOWNLOAD_CONCURRENCY
         
-        if self.table_type == 'raw':
-            report_table = download_samples(
-                self.id,
-                ena_sample_info_table=self._obj,
-                destination_folder=self.path, 
-                keep_failed=keep_failed,
-                NO_PROGRESS_BAR=NO_PROGRESS_BAR
-            )
-            report_table.ena.id = self.id
-            report_table.ena.path = self.path
-            return report_table
+        report_table = download_samples(
+            self.id,
+            destination_folder=self.path,
+            keep_failed=keep_failed,
+            NO_PROGRESS_BAR=NO_PROGRESS_BAR,
+            concurrency=concurrency or DOWNLOAD_CONCURRENCY,
+            **self._table_argument()
+        )
+        report_table.ena.id = self.id
+        report_table.ena.path = self.path
+        return report_table
+    
+    def iter_download(self, keep_failed=False, NO_PROGRESS_BAR=False,
+                      concurrency=None):
+        """
+        Download FASTQ files, yielding the result for each run as it completes.
         
-        if self.table_type == 'ready':
-            report_table = download_samples(
-                self.id,
-                downoad_info_table=self._obj,
-                destination_folder=self.path,
-                keep_failed=keep_failed,
-                NO_PROGRESS_BAR=NO_PROGRESS_BAR
-            )
-            report_table.ena.id = self.id
-            report_table.ena.path = self.path
-            return report_table
+        The download table is still saved to the project folder, but it is
+        not returned.
         
-        raise ValueError('Unable to detect table type. Check column names.')
+        Args:
+            concurrency: Number of runs downloaded in parallel
+                (default: DOWNLOAD_CONCURRENCY, 4)
+        
+        Yields:
+            tuple: (run accession, download status)
+            
+        Raises:
+            ValueError: If project ID is not set or table type is invalid
+            
+        Example:
+            >>> info_table = ENATool.fetch('PRJNA335681')
+            >>> for accession, status in info_table.ena.iter_download():
+            ...     print(accession, status)
+        """
+        from .safe_samples_downloader import iter_download_samples, DOWNLOAD_CONCURRENCY
+        
+        return iter_download_samples(
+            self.id,
+            destination_folder=self.path,
+            keep_failed=keep_failed,
+            NO_PROGRESS_BAR=NO_PROGRESS_BAR,
+            concurrency=concurrency or DOWNLOAD_CONCURRENCY,
+            **self._table_argument()
+        )
             
     def reinit(self, obj):
         """
         Reinitialize ENA tool features from another DataFrame.
         
+        Only the id and path attributes are copied; no reference to `obj`
+        or its data is kept.
+        
         Args:
             obj: DataFrame with existing ena.id and ena.path attributes
             
@@ -130,7 +217,8 @@ class ENATool:
         self.path = obj.ena.path
 
 
-def fetch(project_id, path=None, download=False, keep_failed=False,  NO_PROGRESS_BAR=False):
+def fetch(project_id, path=None, download=False, keep_failed=False,  NO_PROGRESS_BAR=False, query=None,
+          generate_html=True, concurrency=None, create_dir=True):
     """
     Fetch all metadata from ENA for a project and optionally download raw files.
     
@@ -148,6 +236,15 @@ def fetch(project_id, path=None, download=False, keep_failed=False,  NO_PROGRESS
             Defaults to False.
         NO_PROGRESS_BAR (bool, optional): If True, disables a progress bar. 
             Defaults to False.
+        query (str, optional): ENA search query applied on the server, so only
+            matching runs are downloaded and parsed
+            (e.g., 'scientific_name="Homo sapiens"'). Defaults to None.
+        generate_html (bool, optional): If False, skips rendering the interactive
+            HTML table; only the CSV is saved. Defaults to True.
+        concurrency (int, optional): Number of runs downloaded in parallel
+            when download=True. Defaults to 4.
+        create_dir (bool, optional): If False, `path` is assumed to exist
+            already and is not created. Defaults to True.
     
     Returns:
         DataFrame or tuple: 
@@ -162,31 +259,115 @@ def fetch(project_id, path=None, download=False, keep_failed=False,  NO_PROGRESS
         >>> # Get metadata and download files
         >>> info, downloads = ENATool.fetch('PRJNA335681', download=True)
         >>> print(downloads['download_status'].value_counts())
+        >>> 
+        >>> # Only fetch paired-end runs
+        >>> paired = ENATool.fetch('PRJNA335681', query='library_layout="PAIRED"')
     """
     if path is None:
         path = project_id
     
-    path = os.path.abspath(path)
+    if not os.path.isabs(path):
+        path = os.path.abspath(path)
+    
+    from .extract_samples_info import get_samples_info_by_ena_prj_name
     
     # Get sample information
-    info_table = get_samples_info_by_ena_prj_name(project_id, path, NO_PROGRESS_BAR=NO_PROGRESS_BAR)
-    info_table.ena.id = project_id
-    info_table.ena.path = path
+    info_table = get_samples_info_by_ena_prj_name(
+        project_id, path, NO_PROGRESS_BAR=NO_PROGRESS_BAR, query=query,
+        generate_html=generate_html, create_dir=create_dir
+    )
+    _init_info_table(info_table, project_id, path)
     
     if download:
-        download_table = info_table.ena.download(keep_failed, NO_PROGRESS_BAR)
+        download_table = info_table.ena.download(keep_failed, NO_PROGRESS_BAR, concurrency)
         return info_table, download_table
     
     return info_table
 
 
+def fetch_many(project_ids, path=None, NO_PROGRESS_BAR=False, query=None, generate_html=True):
+    """
+    Fetch metadata for several ENA projects, listing their runs in a single request.
+    
+    Sample metadata is then retrieved per project, as in `fetch`. Each project
+    is saved to its own `path/project_id` directory.
+    
+    Args:
+        project_ids (list): ENA project accessions (primary or secondary)
+        path (str, optional): Parent directory for the project directories.
+            Defaults to the current directory.
+        NO_PROGRESS_BAR (bool, optional): If True, disables a progress bar.
+            Defaults to False.
+        query (str, optional): ENA search query applied to all projects.
+            Defaults to None.
+        generate_html (bool, optional): If False, skips rendering the interactive
+            HTML tables. Defaults to True.
+    
+    Returns:
+        dict: Maps each project accession to its info_table. Projects without
+            any (matching) runs, and projects whose metadata could not be
+            retrieved, are left out.
+    
+    Example:
+        >>> tables = ENATool.fetch_many(['PRJNA335681', 'PRJEB2961'], path='data')
+        >>> for project_id, info in tables.items():
+        ...     print(project_id, len(info))
+    """
+    from .extract_samples_info import download_projects_file, get_samples_info_by_ena_prj_name
+    
+    project_ids = list(dict.fromkeys(project_ids))
+    path = os.path.abspath(path or os.curdir)
+    
+    # One request for all projects, split client-side by study accession
+    samples_info = download_projects_file(project_ids, query=query)
+    runs_by_study = dict(list(samples_info.groupby('study_accession', sort=False)))
+    primary_accessions = dict(zip(
+        samples_info['secondary_study_accession'], samples_info['study_accession']
+    ))
+    
+    info_tables = {}
+    for project_id in project_ids:
+        runs = runs_by_study.get(project_id)
+        if runs is None:
+            runs = runs_by_study.get(primary_accessions.get(project_id))
+        if runs is None:
+            continue
+        
+        project_path = os.path.join(path, project_id)
+        try:
+            info_table = get_samples_info_by_ena_prj_name(
+                project_id, project_path, NO_PROGRESS_BAR=NO_PROGRESS_BAR,
+                generate_html=generate_html, samples_info=runs.reset_index(drop=True)
+            )
+        except Exception as e:
+            # Keep the projects that were already fetched
+            print(f"Failed to fetch metadata for {project_id}: {e}")
+            continue
+        info_tables[project_id] = _init_info_table(info_table, project_id, project_path)
+    
+    return info_tables
+
+
+def _init_info_table(info_table, project_id, path):
+    """Store low-cardinality columns as categoricals and set ena.id and ena.path."""
+    for column in _CATEGORICAL_COLUMNS:
+        if column in info_table.columns:
+            info_table[column] = info_table[column].astype('category')
+    info_table.ena.id = project_id
+    info_table.ena.path = path
+    return info_table
+
+
 # Convenience exports
 __all__ = [
     'fetch',
+    'fetch_many',
     'ENATool',
     'get_samples_info_by_ena_prj_name',
     'download_samples',
+    'iter_download_samples',
     'get_ena_filereport_url',
+    'get_ena_search_url',
     'get_ena_sample_xml_url',
     'get_ncbi_biosample_url',
 ]
@@ -2,9 +2,23 @@
 API URL Templates for ENA and NCBI
 
 This module contains all URL templates and API endpoints used for accessing
-ENA (European Nucleotide Archive) and NCBI resources.
+ENA (European Nucleotide Archive) and NCBI resources, together with the
+shared HTTP session used to request them.
 """
 
+import hashlib
+import os
+import threading
+import time
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 # ENA API Base URLs
 ENA_PORTAL_API_BASE = "https://www.ebi.ac.uk/ena/portal/api"
 ENA_BROWSER_API_BASE = "https://www.ebi.ac.uk/ena/browser/api"
@@ -13,8 +27,8 @@ ENA_BROWSER_API_BASE = "https://www.ebi.ac.uk/ena/browser/api"
 NCBI_BIOSAMPLE_BASE = "https://www.ncbi.nlm.nih.gov/biosample"
 
 
-# ENA File Report Fields
-ENA_FILEREPORT_FIELDS = [
+# ENA File Report Fields (tuples, so the joined string below cannot go stale)
+ENA_FILEREPORT_FIELDS = (
     "study_accession",
     "secondary_study_accession",
     "sample_accession",
@@ -45,25 +59,59 @@ ENA_FILEREPORT_FIELDS = [
     "fastq_bytes",
     "fastq_md5",
     "fastq_ftp",
-    "fastq_aspera",
-    "fastq_galaxy",
     "submitted_bytes",
     "submitted_md5",
     "submitted_ftp",
-    "submitted_aspera",
-    "submitted_galaxy",
     "submitted_format",
     "sra_bytes",
     "sra_md5",
     "sra_ftp",
-    "sra_aspera",
-    "sra_galaxy",
     "sample_alias",
     "broker_name",
     "sample_title",
     "nominal_sdev",
     "first_created"
-]
+)
+
+# Aspera/Galaxy mirrors of the FTP links above; ENATool itself never uses
+# them, so they are only requested when ENATOOL_EXTENDED_FIELDS=1
+ENA_FILEREPORT_FIELDS_EXTENDED = ENA_FILEREPORT_FIELDS + (
+    "fastq_aspera",
+    "fastq_galaxy",
+    "submitted_aspera",
+    "submitted_galaxy",
+    "sra_aspera",
+    "sra_galaxy"
+)
+
+# Fields actually requested from ENA
+FILEREPORT_FIELDS = (
+    ENA_FILEREPORT_FIELDS_EXTENDED
+    if os.environ.get('ENATOOL_EXTENDED_FIELDS') == '1'
+    else ENA_FILEREPORT_FIELDS
+)
+
+# URL templates are rendered once at import; only the accession varies per call
+_FIELDS_STR = ",".join(FILEREPORT_FIELDS)
+_FILEREPORT_URL_TMPL = (
+    f"{ENA_PORTAL_API_BASE}/filereport?"
+    f"accession=%s&"
+    f"result=read_run&"
+    f"fields={_FIELDS_STR}&"
+    f"format=tsv&"
+    f"download=true"
+)
+# Same table as the file report, but filtered on the server by an ENA search query
+_SEARCH_URL_TMPL = (
+    f"{ENA_PORTAL_API_BASE}/search?"
+    f"result=read_run&"
+    f"query=%s&"
+    f"fields={_FIELDS_STR}&"
+    f"format=tsv&"
+    f"limit=0"
+)
+_SAMPLE_XML_URL_TMPL = f"{ENA_BROWSER_API_BASE}/xml/%s?download=true"
+_NCBI_BIOSAMPLE_URL_TMPL = f"{NCBI_BIOSAMPLE_BASE}/%s"
 
 
 def get_ena_filereport_url(project_accession: str) -> str:
@@ -80,16 +128,50 @@ def get_ena_filereport_url(project_accession: str) -> str:
         >>> get_ena_filereport_url('PRJNA335681')
         'https://www.ebi.ac.uk/ena/portal/api/filereport?accession=...'
     """
-    fields_str = ",".join(ENA_FILEREPORT_FIELDS)
+    return _FILEREPORT_URL_TMPL % project_accession
+
+
+def get_ena_search_url(project_accession: str, query: str) -> str:
+    """
+    Generate URL for ENA portal search, restricted to one project.
+    
+    Args:
+        project_accession: ENA project accession (e.g., 'PRJNA335681')
+        query: ENA portal search query (e.g., 'scientific_name="Homo sapiens"')
+        
+    Returns:
+        URL returning the file report rows of the project that match `query`
+        
+    Example:
+        >>> get_ena_search_url('PRJNA335681', 'library_layout="PAIRED"')
+        'https://www.ebi.ac.uk/ena/portal/api/search?result=read_run&query=...'
+    """
+    return get_ena_projects_search_url([project_accession], query)
+
+
+def get_ena_projects_search_url(project_accessions: Iterable[str],
+                                query: Optional[str] = None) -> str:
+    """
+    Generate URL for a single ENA portal search covering several projects.
     
-    return (
-        f"{ENA_PORTAL_API_BASE}/filereport?"
-        f"accession={project_accession}&"
-        f"result=read_run&"
-        f"fields={fields_str}&"
-        f"format=tsv&"
-        f"download=true"
+    Args:
+        project_accessions: ENA project accessions (primary or secondary)
+        query: Optional ENA portal search query applied to all projects
+        
+    Returns:
+        URL returning the file report rows of all the projects
+        
+    Example:
+        >>> get_ena_projects_search_url(['PRJNA335681', 'PRJEB2961'])
+        'https://www.ebi.ac.uk/ena/portal/api/search?result=read_run&query=...'
+    """
+    project_query = ' OR '.join(
+        f'study_accession="{accession}" OR secondary_study_accession="{accession}"'
+        for accession in project_accessions
     )
+    if query:
+        project_query = f'({project_query}) AND ({query})'
+    return _SEARCH_URL_TMPL % quote(project_query, safe='')
 
 
 def get_ena_sample_xml_url(sample_accession: str) -> str:
@@ -106,7 +188,7 @@ def get_ena_sample_xml_url(sample_accession: str) -> str:
         >>> get_ena_sample_xml_url('SAMN12345678')
         'https://www.ebi.ac.uk/ena/browser/api/xml/SAMN12345678?download=true'
     """
-    return f"{ENA_BROWSER_API_BASE}/xml/{sample_accession}?download=true"
+    return _SAMPLE_XML_URL_TMPL % sample_accession
 
 
 def get_ncbi_biosample_url(sample_accession: str) -> str:
@@ -123,4 +205,149 @@ def get_ncbi_biosample_url(sample_accession: str) -> str:
         >>> get_ncbi_biosample_url('SAMN12345678')
         'https://www.ncbi.nlm.nih.gov/biosample/SAMN12345678'
     """
-    return f"{NCBI_BIOSAMPLE_BASE}/{sample_accession}"
+    return _NCBI_BIOSAMPLE_URL_TMPL % sample_accession
+
+
+
+# Opt-in on-disk response cache (set ENATOOL_CACHE=1 to enable)
+CACHE_DIR = os.environ.get('ENATOOL_CACHE_DIR', os.path.expanduser('~/.cache/enatool'))
+FILEREPORT_CACHE_TTL = 24 * 60 * 60  # seconds; sample XML never expires
+
+# Number of concurrent requests for batch fetches (override with ENATOOL_HTTP_WORKERS)
+HTTP_WORKERS = int(os.environ.get('ENATOOL_HTTP_WORKERS', 8))
+
+# NCBI allows about 3 requests per second without an API key; the workers
+# overlap request latency, NCBI_MAX_RATE caps how often requests are started
+NCBI_WORKERS = 3
+NCBI_MAX_RATE = 3  # requests per second
+
+
+# Shared HTTP session: keeps connections to ENA/NCBI alive between requests
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept-Encoding': 'gzip, deflate'})
+_ADAPTER = HTTPAdapter(
+    pool_connections=8,
+    # At least one pooled connection per worker, so none are dropped after use
+    pool_maxsize=max(32, HTTP_WORKERS),
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504)
+    )
+)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
+
+
+def fetch_url(url: str, **kwargs) -> requests.Response:
+    """
+    GET a URL through the shared session.
+    
+    Args:
+        url: URL to request
+        **kwargs: Extra arguments passed to `requests.Session.get`
+        
+    Returns:
+        Response object (HTTP errors are raised)
+        
+    Example:
+        >>> xml = fetch_url(get_ena_sample_xml_url('SAMN12345678')).content
+    """
+    kwargs.setdefault('allow_redirects', True)
+    response = _SESSION.get(url, **kwargs)
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError:
+        # Release the connection back to the pool before propagating
+        response.close()
+        raise
+    return response
+
+
+class _RateLimiter:
+    """Spaces out calls to `wait` from any number of threads to `rate` per second."""
+    
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def cached_get(url: str, max_age: Optional[float] = None,
+               cache_dir: Optional[str] = None,
+               rate_limiter: Optional[_RateLimiter] = None) -> bytes:
+    """
+    GET a URL and return its body, using the on-disk cache if enabled.
+    
+    The cache is only used when the ENATOOL_CACHE environment variable is
+    set to 1. Entries are stored under the SHA-256 of the URL.
+    
+    Args:
+        url: URL to request
+        max_age: Maximum age of a cached entry in seconds (None: never expires)
+        cache_dir: Cache directory (defaults to CACHE_DIR)
+        rate_limiter: Throttle applied before network requests (cache hits are not throttled)
+        
+    Returns:
+        Response body as bytes
+    """
+    if os.environ.get('ENATOOL_CACHE') != '1':
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        return fetch_url(url).content
+    
+    cache_dir = cache_dir or CACHE_DIR
+    filepath = os.path.join(cache_dir, hashlib.sha256(url.encode()).hexdigest())
+    
+    if os.path.exists(filepath):
+        if max_age is None or time.time() - os.path.getmtime(filepath) < max_age:
+            with open(filepath, 'rb') as f:
+                return f.read()
+    
+    if rate_limiter is not None:
+        rate_limiter.wait()
+    data = fetch_url(url).content
+    
+    # Write atomically so concurrent runs never read a partial entry
+    os.makedirs(cache_dir, exist_ok=True)
+    # pid and thread id keep concurrent writers of the same URL apart
+    tmp_filepath = f'{filepath}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_filepath, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_filepath, filepath)
+    
+    return data
+
+
+def cached_get_many(urls: Iterable[str], max_workers: Optional[int] = None,
+                    max_age: Optional[float] = None,
+                    max_rate: Optional[float] = None) -> Iterator[bytes]:
+    """
+    GET several URLs concurrently through `cached_get`.
+    
+    Args:
+        urls: URLs to request
+        max_workers: Number of concurrent requests (defaults to HTTP_WORKERS)
+        max_age: Maximum age of cached entries in seconds, see `cached_get`
+        max_rate: Maximum number of requests started per second (None: unlimited)
+        
+    Yields:
+        Response bodies as bytes, in the same order as `urls`
+        
+    Example:
+        >>> urls = [get_ena_sample_xml_url(s) for s in ['SAMN1', 'SAMN2']]
+        >>> xmls = list(cached_get_many(urls))
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or HTTP_WORKERS) as executor:
+        rate_limiter = _RateLimiter(max_rate) if max_rate else None
+        yield from executor.map(
+            partial(cached_get, max_age=max_age, rate_limiter=rate_limiter), urls
+        )
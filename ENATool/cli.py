@@ -3,26 +3,139 @@ ENATool Command Line Interface
 
 This module provides command-line access to ENATool functionality.
 """
-import traceback
 import argparse
 import sys
 import os
+from collections import Counter
 from pathlib import Path
 from typing import Optional
 
-from . import fetch, __version__
-from .safe_samples_downloader import get_download_summary
+from . import __version__
 
+# Columns read back from saved tables; the rest of the metadata is not needed
+_INFO_COLUMNS = frozenset({
+    'run_accession', 'scientific_name', 'instrument_platform',
+    'library_strategy', 'library_layout'
+})
+_DOWNLOAD_COLUMNS = frozenset({
+    'sample_accession', 'run_accession', 'fastq_ftp', 'fastq_md5'
+})
+_DOWNLOAD_STATUS_COLUMNS = frozenset({'accession', 'download_status'})
 
-def print_banner():
-    """Print ENATool banner."""
-    banner = f"""
+# Download table written next to raw_reads/; older versions misspelled its name
+_DOWNLOAD_TABLE_NAMES = ('download_info_table.csv', 'downoad_info_table.csv')
+
+# (column, heading, number of top values shown) for `enatool info`
+_INFO_SUMMARIES = (
+    ('scientific_name', 'Organisms', 10),
+    ('instrument_platform', 'Sequencing Platforms', None),
+    ('library_strategy', 'Library Strategies', 5),
+    ('library_layout', 'Library Layout', None),
+)
+
+# Rendered once at import; the trailing blank line matches print(banner)
+_BANNER = f"""
 ╔══════════════════════════════════════════════════════════════════╗
 ║                        ENATool v{__version__}                            ║
 ║          European Nucleotide Archive Data Manager                ║
 ╚══════════════════════════════════════════════════════════════════╝
+
 """
-    print(banner)
+
+
+def _format_counts(counts, line_format):
+    """
+    Render a value_counts() Series as text, one formatted line per value.
+    
+    Args:
+        counts: Series mapping values to their counts
+        line_format: Format string with two positional fields (value, count)
+    
+    Returns:
+        Formatted lines joined into a single string
+    """
+    return "".join(
+        line_format.format(value, count)
+        for value, count in zip(counts.index.to_numpy(), counts.to_numpy())
+    )
+
+
+def _read_download_status(download_file):
+    """
+    Read the accession and download status columns of a download table.
+    
+    Uses the multithreaded pyarrow CSV reader when it is available and
+    falls back to the default pandas reader otherwise.
+    
+    Args:
+        download_file: Path to the tab-separated download table
+    
+    Returns:
+        DataFrame with the available status columns
+    """
+    import pandas as pd
+    
+    try:
+        return pd.read_csv(
+            download_file,
+            sep='\t',
+            engine='pyarrow',
+            usecols=sorted(_DOWNLOAD_STATUS_COLUMNS),
+            dtype_backend='pyarrow'
+        )
+    except (ImportError, TypeError, ValueError, KeyError):
+        # pyarrow missing, pandas too old for it, or a column is absent
+        return pd.read_csv(
+            download_file,
+            sep='\t',
+            usecols=lambda c: c in _DOWNLOAD_STATUS_COLUMNS
+        )
+
+
+def _download_and_summarize(info, keep_failed, no_progress_bar, jobs, out):
+    """
+    Download FASTQ files for a metadata table and add a download summary to `out`.
+    
+    Results are tallied as each run completes, so the download table itself
+    is never held in memory.
+    
+    Args:
+        info: Metadata DataFrame with ena.id and ena.path set
+        keep_failed: Keep files that fail the md5 check
+        no_progress_bar: Disable the progress bar
+        jobs: Number of runs downloaded in parallel
+        out: List of output chunks the summary lines are appended to
+    """
+    status_counts = Counter()
+    failed_accessions = []
+    n_failed = 0
+    
+    for accession, status in info.ena.iter_download(keep_failed, no_progress_bar, jobs):
+        if status is None:
+            continue
+        statuses = status if isinstance(status, list) else [status]
+        status_counts.update(statuses)
+        if 'Error' in statuses:
+            n_failed += 1
+            if len(failed_accessions) < 5:
+                failed_accessions.append(accession)
+    
+    out.append(f"\n📥 Download Summary:\n")
+    out.append(f"  • Total files: {sum(status_counts.values())}\n")
+    out.append(f"  • Successfully downloaded: {status_counts['OK']}\n")
+    out.append(f"  • Already existed: {status_counts['Exists']}\n")
+    out.append(f"  • Failed: {status_counts['Error']}\n")
+    
+    if n_failed > 0:
+        out.append(f"\n⚠ Some downloads failed. Check the download table for details.\n")
+        out.append(f"  Failed accessions: {', '.join(failed_accessions)}\n")
+        if n_failed > 5:
+            out.append(f"  ... and {n_failed - 5} more\n")
+
+
+def print_banner():
+    """Print ENATool banner."""
+    sys.stdout.write(_BANNER)
 
 
 def fetch_metadata_command(args):
@@ -32,38 +145,45 @@ def fetch_metadata_command(args):
     Args:
         args: Parsed command-line arguments
     """
+    from . import fetch
+    
     print(f"📊 Fetching metadata for project: {args.project_id}")
     
     # Determine output path
-    output_path = args.path or args.project_id
+    output_path = os.path.abspath(args.path or args.project_id)
     
     try:
         # Fetch metadata
         info = fetch(args.project_id, path=output_path, download=False, NO_PROGRESS_BAR=args.no_progress_bar)
         
         # Print summary
-        print(f"\n✓ Successfully retrieved metadata")
-        print(f"  • Total samples: {len(info)}")
-        print(f"  • Output directory: {os.path.abspath(output_path)}")
-        print(f"  • CSV file: {args.project_id}.csv")
-        print(f"  • HTML file: {args.project_id}.html")
+        out = []
+        out.append(f"\n✓ Successfully retrieved metadata\n")
+        out.append(f"  • Total samples: {len(info)}\n")
+        out.append(f"  • Output directory: {output_path}\n")
+        out.append(f"  • CSV file: {args.project_id}.csv\n")
+        out.append(f"  • HTML file: {args.project_id}.html\n")
         
         # Show organism breakdown if available
         if 'scientific_name' in info.columns:
-            print(f"\n  Organisms:")
-            for organism, count in info['scientific_name'].value_counts().head(5).items():
-                print(f"    • {organism}: {count} samples")
+            out.append(f"\n  Organisms:\n")
+            out.append(_format_counts(
+                info['scientific_name'].value_counts().iloc[:5], "    • {}: {} samples\n"
+            ))
         
         # Show platform breakdown if available
         if 'instrument_platform' in info.columns:
-            print(f"\n  Sequencing platforms:")
-            for platform, count in info['instrument_platform'].value_counts().items():
-                print(f"    • {platform}: {count} samples")
+            out.append(f"\n  Sequencing platforms:\n")
+            out.append(_format_counts(
+                info['instrument_platform'].value_counts(), "    • {}: {} samples\n"
+            ))
         
-        print(f"\n✓ Metadata extraction complete!")
+        out.append(f"\n✓ Metadata extraction complete!\n")
+        sys.stdout.write("".join(out))
         return 0
         
     except Exception as e:
+        import traceback
         print()
         print(traceback.format_exc())
         print(f"✗ Error: {e}", file=sys.stderr)
@@ -77,40 +197,31 @@ def download_command(args):
     Args:
         args: Parsed command-line arguments
     """
+    from . import fetch
+    
     print(f"📥 Fetching metadata and downloading FASTQ files for: {args.project_id}")
     
     # Determine output path
-    output_path = args.path or args.project_id
+    output_path = os.path.abspath(args.path or args.project_id)
     
     try:
-        # Fetch metadata and download files
-        info, downloads = fetch(args.project_id, path=output_path, download=True, keep_failed=args.keep_failed, NO_PROGRESS_BAR=args.no_progress_bar)
+        # Fetch metadata
+        info = fetch(args.project_id, path=output_path, download=False, NO_PROGRESS_BAR=args.no_progress_bar)
         
         # Print metadata summary
         print(f"\n✓ Metadata retrieved: {len(info)} samples")
         
-        # Print download summary
-        summary = get_download_summary(downloads)
-        
-        print(f"\n📥 Download Summary:")
-        print(f"  • Total files: {summary['total']}")
-        print(f"  • Successfully downloaded: {summary['successful']}")
-        print(f"  • Already existed: {summary['already_existed']}")
-        print(f"  • Failed: {summary['failed']}")
-        
-        if summary['failed'] > 0:
-            print(f"\n⚠ Some downloads failed. Check the download table for details.")
-            failed = downloads[downloads['download_status'] == 'Error']
-            print(f"  Failed accessions: {', '.join(failed['accession'].tolist()[:5])}")
-            if len(failed) > 5:
-                print(f"  ... and {len(failed) - 5} more")
-        
-        print(f"\n✓ Files saved to: {os.path.abspath(output_path)}/raw_reads/")
-        print(f"✓ Download complete!")
+        # Download files, then print the summary in one write
+        out = []
+        _download_and_summarize(info, args.keep_failed, args.no_progress_bar, args.jobs, out)
+        out.append(f"\n✓ Files saved to: {output_path}/raw_reads/\n")
+        out.append(f"✓ Download complete!\n")
+        sys.stdout.write("".join(out))
         
         return 0
         
     except Exception as e:
+        import traceback
         print()
         print(traceback.format_exc())
         print(f"✗ Error: {e}", file=sys.stderr)
@@ -126,9 +237,11 @@ def download_files_only_command(args):
     """
     print(f"📥 Downloading FASTQ files for existing metadata")
     
+    output_path = os.path.abspath(args.path)
+    
     try:
         # Check if metadata exists
-        csv_file = os.path.join(args.path, f"{args.project_id}.csv")
+        csv_file = os.path.join(output_path, f"{args.project_id}.csv")
         if not os.path.exists(csv_file):
             print(f"\n✗ Error: Metadata file not found: {csv_file}")
             print(f"  Run 'enatool fetch {args.project_id}' first to get metadata")
@@ -136,40 +249,26 @@ def download_files_only_command(args):
         
         # Load existing metadata
         import pandas as pd
-        info = pd.read_csv(csv_file)
+        info = pd.read_csv(csv_file, usecols=lambda c: c in _DOWNLOAD_COLUMNS)
         
         # Set up ena accessor
         info.ena.id = args.project_id
-        info.ena.path = args.path
+        info.ena.path = output_path
         
         print(f"  • Found {len(info)} samples in metadata")
         print(f"  • Starting download...")
         
-        # Download files
-        downloads = info.ena.download(keep_failed=args.keep_failed, NO_PROGRESS_BAR=args.no_progress_bar)
-        
-        # Print summary
-        summary = get_download_summary(downloads)
-        
-        print(f"\n📥 Download Summary:")
-        print(f"  • Total files: {summary['total']}")
-        print(f"  • Successfully downloaded: {summary['successful']}")
-        print(f"  • Already existed: {summary['already_existed']}")
-        print(f"  • Failed: {summary['failed']}")
-
-        if summary['failed'] > 0:
-            print(f"\n⚠ Some downloads failed. Check the download table for details.")
-            failed = downloads[downloads['download_status'] == 'Error']
-            print(f"  Failed accessions: {', '.join(failed['accession'].tolist()[:5])}")
-            if len(failed) > 5:
-                print(f"  ... and {len(failed) - 5} more")
-        
-        print(f"\n✓ Files saved to: {os.path.abspath(args.path)}/raw_reads/")
-        print(f"✓ Download complete!")
+        # Download files, then print the summary in one write
+        out = []
+        _download_and_summarize(info, args.keep_failed, args.no_progress_bar, args.jobs, out)
+        out.append(f"\n✓ Files saved to: {output_path}/raw_reads/\n")
+        out.append(f"✓ Download complete!\n")
+        sys.stdout.write("".join(out))
         
         return 0
         
     except Exception as e:
+        import traceback
         print()
         print(traceback.format_exc())
         print(f"✗ Error: {e}", file=sys.stderr)
@@ -193,53 +292,69 @@ def info_command(args):
             print(f"  Run 'enatool fetch {args.project_id}' first")
             return 1
         
-        # Load metadata
-        info = pd.read_csv(csv_file)
-        
-        print(f"\n📊 Project Information: {args.project_id}")
-        print(f"{'='*60}")
-        print(f"Total samples: {len(info)}")
-        
-        if 'scientific_name' in info.columns:
-            print(f"\nOrganisms ({info['scientific_name'].nunique()}):")
-            for organism, count in info['scientific_name'].value_counts().head(10).items():
-                print(f"  • {organism}: {count}")
-        
-        if 'instrument_platform' in info.columns:
-            print(f"\nSequencing Platforms:")
-            for platform, count in info['instrument_platform'].value_counts().items():
-                print(f"  • {platform}: {count}")
+        # Load metadata (summary columns only, as categoricals)
+        info = pd.read_csv(
+            csv_file,
+            usecols=lambda c: c in _INFO_COLUMNS,
+            dtype='category'
+        )
         
-        if 'library_strategy' in info.columns:
-            print(f"\nLibrary Strategies:")
-            for strategy, count in info['library_strategy'].value_counts().head(5).items():
-                print(f"  • {strategy}: {count}")
+        out = [
+            f"\n📊 Project Information: {args.project_id}\n",
+            f"{'='*60}\n",
+            f"Total samples: {len(info)}\n",
+        ]
         
-        if 'library_layout' in info.columns:
-            print(f"\nLibrary Layout:")
-            for layout, count in info['library_layout'].value_counts().items():
-                print(f"  • {layout}: {count}")
+        # One value_counts per column; organism count reuses its histogram
+        summaries = {
+            column: info[column].value_counts()
+            for column, _, _ in _INFO_SUMMARIES
+            if column in info.columns
+        }
+        for column, heading, top in _INFO_SUMMARIES:
+            if column not in summaries:
+                continue
+            counts = summaries[column]
+            if column == 'scientific_name':
+                heading = f"{heading} ({len(counts)})"
+            out.append(f"\n{heading}:\n")
+            out.append(_format_counts(counts.iloc[:top], "  • {}: {}\n"))
         
         # Check for download info
-        download_file = os.path.join(args.path, 'downoad_info_table.csv')
-        if os.path.exists(download_file):
-            downloads = pd.read_csv(download_file, sep='\t')
+        download_file = next((
+            os.path.join(args.path, name) for name in _DOWNLOAD_TABLE_NAMES
+            if os.path.exists(os.path.join(args.path, name))
+        ), None)
+        if download_file is not None:
+            downloads = _read_download_status(download_file)
             if 'download_status' in downloads.columns:
-                print(f"\nDownload Status:")
-                for status, count in downloads['download_status'].value_counts().items():
-                    print(f"  • {status}: {count}")
+                out.append(f"\nDownload Status:\n")
+                out.append(_format_counts(
+                    downloads['download_status'].value_counts(), "  • {}: {}\n"
+                ))
+        
+        sys.stdout.write("".join(out))
         
         return 0
         
     except Exception as e:
+        import traceback
         print()
         print(traceback.format_exc())
         print(f"✗ Error: {e}", file=sys.stderr)
         return 1
 
 
-def main():
-    """Main CLI entry point."""
+def main(argv=None):
+    """
+    Main CLI entry point.
+    
+    Args:
+        argv: Argument list to parse instead of sys.argv[1:]
+    
+    Returns:
+        int: Exit code
+    """
     parser = argparse.ArgumentParser(
         prog='enatool',
         description='ENATool - European Nucleotide Archive Data Manager',
@@ -255,8 +370,8 @@ Examples:
   # Fetch metadata and download FASTQ files
   enatool download PRJNA335681
   
-  # Download files for existing metadata
-  enatool download-files PRJNA335681 --path my_project
+  # Download files for existing metadata, 8 runs at a time
+  enatool download-files PRJNA335681 --path my_project --jobs 8
   
   # Show project information
   enatool info PRJNA335681 --path my_project
@@ -321,6 +436,12 @@ For more information: https://github.com/RCPCM-GCB/ENATool
         action='store_true',
         help='Keep files that downloaded with md5 errors'
     )
+    download_parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Number of runs downloaded in parallel (default: 4)',
+        metavar='N'
+    )
     
     # Download-files command (files only for existing metadata)
     download_files_parser = subparsers.add_parser(
@@ -343,6 +464,12 @@ For more information: https://github.com/RCPCM-GCB/ENATool
         action='store_true',
         help='Keep files that downloaded with md5 errors'
     )
+    download_files_parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Number of runs downloaded in parallel (default: 4)',
+        metavar='N'
+    )
     
     # Info command
     info_parser = subparsers.add_parser(
@@ -362,7 +489,7 @@ For more information: https://github.com/RCPCM-GCB/ENATool
     )
     
     # Parse arguments
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Show banner unless suppressed
     if not args.no_banner:
@@ -10,12 +10,15 @@ Example usage:
     samples_table = get_samples_info_by_ena_prj_name('PRJNA335681', folder=folder)
 """
 
+import io
+import json
 import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import pandas as pd
-import numpy as np
-import requests
-import xmltodict
+from lxml import etree, html
 from typing import List, Union, Tuple, Optional
 
 # Handle tqdm for both notebook and regular environments
@@ -28,41 +31,106 @@ except NameError:
 from .html_templates import generate_html_report
 from .api_urls import (
     get_ena_filereport_url,
+    get_ena_search_url,
+    get_ena_projects_search_url,
     get_ena_sample_xml_url,
-    get_ncbi_biosample_url
+    get_ncbi_biosample_url,
+    cached_get,
+    cached_get_many,
+    FILEREPORT_FIELDS,
+    FILEREPORT_CACHE_TTL,
+    HTTP_WORKERS,
+    NCBI_WORKERS,
+    NCBI_MAX_RATE
 )
 
 
-def download_samples_file(prj_name: str, folder: str = '') -> pd.DataFrame:
+def download_samples_file(prj_name: str, folder: str = '',
+                          query: Optional[str] = None) -> pd.DataFrame:
     """
     Download sample information file from ENA for a given project.
     
     Args:
         prj_name: ENA project accession (e.g., 'PRJNA335681')
         folder: Directory to save the downloaded file
+        query: Optional ENA search query; only matching runs are returned
         
     Returns:
         DataFrame containing sample information
+        
+    Raises:
+        ValueError: If ENA returns no runs (e.g. the query matches none)
+    """
+    if query:
+        url = get_ena_search_url(prj_name, query)
+    else:
+        url = get_ena_filereport_url(prj_name)
+    data = cached_get(url, max_age=FILEREPORT_CACHE_TTL)
+    if not data.strip():
+        if query:
+            raise ValueError(f'No runs of project {prj_name} match the query {query!r}')
+        raise ValueError(f'No runs found for project {prj_name}')
+    return _read_report(data)
+
+
+def download_projects_file(prj_names: List[str], query: Optional[str] = None) -> pd.DataFrame:
+    """
+    Download sample information for several ENA projects with a single request.
+    
+    Args:
+        prj_names: ENA project accessions
+        query: Optional ENA search query applied to all projects
+        
+    Returns:
+        DataFrame containing sample information of all projects; use
+        study_accession or secondary_study_accession to tell them apart
     """
-    url = get_ena_filereport_url(prj_name)
-    return pd.read_csv(url, sep='\t')
+    url = get_ena_projects_search_url(prj_names, query)
+    data = cached_get(url, max_age=FILEREPORT_CACHE_TTL)
+    return _read_report(data)
 
 
-def download_file(url: str, filename: Optional[str] = None, folder: str = '') -> str:
+def _read_report(data: bytes) -> pd.DataFrame:
+    """
+    Parse a tab-separated ENA report, using the multithreaded pyarrow reader if available.
+    
+    pyarrow turns date-only columns into datetime.date objects; they are
+    converted back to ISO strings so the table matches the default reader.
+    An empty response (no matching runs) gives an empty table with the
+    requested columns.
+    """
+    if not data.strip():
+        return pd.DataFrame(columns=list(FILEREPORT_FIELDS))
+    
+    try:
+        table = pd.read_csv(io.BytesIO(data), sep='\t', engine='pyarrow')
+    except (ImportError, TypeError, ValueError):
+        return pd.read_csv(io.BytesIO(data), sep='\t')
+    
+    for column in table.columns[table.dtypes == object]:
+        if pd.api.types.infer_dtype(table[column], skipna=True) == 'date':
+            table[column] = table[column].map(lambda value: value.isoformat(), na_action='ignore')
+    return table
+
+
+def download_file(url: str, filename: Optional[str] = None, folder: str = '',
+                  force_refresh: bool = False) -> str:
     """
     Download a file from a URL and save it locally.
     
+    A non-empty file already saved under the same name is reused without
+    contacting the server, so interrupted or repeated runs only fetch what
+    is missing.
+    
     Args:
         url: URL to download from
         filename: Optional custom filename
         folder: Directory to save the file
+        force_refresh: Download the file even if it already exists locally
         
     Returns:
         Path to the downloaded file
     """
-    response = requests.get(url, allow_redirects=True)
-    response.raise_for_status()
-    
     if filename is None:
         filename = url.split('/')[-1].replace('?download=true', '') + '.xml'
     
@@ -72,11 +140,21 @@ def download_file(url: str, filename: Optional[str] = None, folder: str = '') ->
     else:
         filepath = os.path.join('xml_files', filename)
     
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    if not force_refresh and os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+        return filepath
+    
+    content = cached_get(url)
     
-    with open(filepath, 'wb') as f:
-        f.write(response.content)
+    # Create directory if it doesn't exist (retrieve_ena_metadata creates it upfront)
+    xml_folder = os.path.dirname(filepath)
+    if not os.path.isdir(xml_folder):
+        os.makedirs(xml_folder, exist_ok=True)
+    
+    # Write through a temporary file so a partial download is never reused
+    tmp_path = f'{filepath}.part'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, filepath)
     
     return filepath
 
@@ -132,47 +210,129 @@ def parse_values(parent_key: str, values: Union[dict, str]) -> dict:
     return result
 
 
-def parse_ena_sample_table(filename: str) -> pd.DataFrame:
+# Parsed sample XML records kept in the project folder between runs (with ENATOOL_CACHE=1),
+# one JSON object per sample; bump the version when the record format changes
+PARSED_METADATA_CACHE = 'parsed_metadata.v1.jsonl'
+PARSED_METADATA_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+
+# Sample XML elements read by parse_ena_sample_table
+_SAMPLE_XML_TAGS = ('IDENTIFIERS', 'SAMPLE_NAME', 'TITLE', 'DESCRIPTION', 'SAMPLE_ATTRIBUTE')
+
+
+def _element_value(elem) -> Union[dict, str, None]:
     """
-    Parse ENA sample XML file into a DataFrame.
+    Convert a leaf XML element to the value xmltodict would produce.
+    
+    Attributes become '@name' keys and text becomes '#text' when attributes
+    are present; otherwise the stripped text (or None if empty) is returned.
+    """
+    text = elem.text.strip() if elem.text else ''
+    if not elem.attrib:
+        return text or None
+    value = {f'@{key}': attr for key, attr in elem.attrib.items()}
+    if text:
+        value['#text'] = text
+    return value
+
+
+def parse_ena_sample_table(filename: str) -> dict:
+    """
+    Parse ENA sample XML file into a flat record.
     
     Args:
         filename: Path to XML file
         
     Returns:
-        DataFrame with parsed sample metadata
+        Dictionary of parsed sample metadata, one entry per column
     """
-    with open(filename, 'r') as f:
-        metadata_dict = xmltodict.parse(f.read())
+    # Collected separately to keep the column order independent of element order
+    identifiers, texts, attributes = {}, {}, {}
     
-    metadata_dict = metadata_dict['SAMPLE_SET']['SAMPLE']
-    metadata_df = {}
+    for _, elem in etree.iterparse(filename, events=('end',), tag=_SAMPLE_XML_TAGS):
+        if elem.tag == 'SAMPLE_ATTRIBUTE':
+            # Parse sample attributes
+            tag = elem.findtext('TAG')
+            if tag is not None:
+                attributes['_'.join(tag.split())] = elem.findtext('VALUE', '').strip() or None
+        elif elem.getparent().tag != 'SAMPLE':
+            continue
+        elif elem.tag in ('IDENTIFIERS', 'SAMPLE_NAME'):
+            # Parse identifiers and sample name; repeated children become lists
+            children = {}
+            for child in elem:
+                value = _element_value(child)
+                if child.tag not in children:
+                    children[child.tag] = value
+                elif isinstance(children[child.tag], list):
+                    children[child.tag].append(value)
+                else:
+                    children[child.tag] = [children[child.tag], value]
+            for key, values in children.items():
+                identifiers.setdefault(elem.tag, {}).update(
+                    parse_values(f'{elem.tag}__{key}', values)
+                )
+        else:
+            # Parse title and description
+            texts[elem.tag] = _element_value(elem)
+        elem.clear()
     
-    # Parse identifiers and sample name
+    metadata_df = {}
     for root_key in ['IDENTIFIERS', 'SAMPLE_NAME']:
-        if root_key in metadata_dict:
-            for key, values in metadata_dict[root_key].items():
-                metadata_df.update(parse_values(f'{root_key}__{key}', values))
-    
-    # Parse title and description
+        metadata_df.update(identifiers.get(root_key, {}))
     for root_key in ['TITLE', 'DESCRIPTION']:
-        if root_key in metadata_dict:
-            metadata_df[root_key] = metadata_dict[root_key]
+        if root_key in texts:
+            metadata_df[root_key] = texts[root_key]
+    metadata_df.update(attributes)
     
-    # Parse sample attributes
-    if 'SAMPLE_ATTRIBUTES' in metadata_dict:
-        sample_attrs = metadata_dict['SAMPLE_ATTRIBUTES']['SAMPLE_ATTRIBUTE']
-        for attribute in sample_attrs:
-            key = '_'.join(attribute['TAG'].split())
-            metadata_df[key] = attribute['VALUE']
+    return metadata_df
+
+
+def _read_metadata_cache(path: str) -> dict:
+    """
+    Load cached parsed sample records that have not expired.
     
-    return pd.DataFrame(metadata_df, index=[0])
+    Returns:
+        Dictionary mapping sample accessions to (fetch time, record); empty if
+        the cache is disabled, missing or unreadable
+    """
+    if os.environ.get('ENATOOL_CACHE') != '1' or not os.path.exists(path):
+        return {}
+    
+    oldest = time.time() - PARSED_METADATA_CACHE_TTL
+    entries = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry['fetched'] >= oldest:
+                    entries[entry['accession']] = (entry['fetched'], entry['record'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    return entries
+
+
+def _write_metadata_cache(entries: dict, path: str) -> None:
+    """Save parsed sample records in the format read by `_read_metadata_cache`."""
+    tmp_path = f'{path}.part'
+    try:
+        with open(tmp_path, 'w') as f:
+            for accession, (fetched, record) in entries.items():
+                f.write(json.dumps({'accession': accession, 'fetched': fetched, 'record': record}))
+                f.write('\n')
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
 def retrieve_ena_metadata(samples: List[str], folder: str, NO_PROGRESS_BAR: bool) -> Optional[pd.DataFrame]:
     """
     Retrieve metadata for multiple ENA samples.
     
+    With ENATOOL_CACHE=1, parsed records are cached in the project folder
+    (see PARSED_METADATA_CACHE), so later runs only fetch samples not seen
+    in the last PARSED_METADATA_CACHE_TTL seconds.
+    
     Args:
         samples: List of sample accessions
         folder: Directory to save downloaded XML files
@@ -182,20 +342,36 @@ def retrieve_ena_metadata(samples: List[str], folder: str, NO_PROGRESS_BAR: bool
         DataFrame with combined metadata, or None if failed
     """
     try:
-        filenames = [
-            download_file(
-                get_ena_sample_xml_url(sample),
-                folder=folder
-            )
-            for sample in tqdm(
-                samples,
-                desc='Getting ENA Metadata',
-                disable=NO_PROGRESS_BAR
-            )
+        cache_path = os.path.join(folder, PARSED_METADATA_CACHE)
+        cached = _read_metadata_cache(cache_path)
+        missing = [
+            sample for sample in dict.fromkeys(samples)
+            if sample not in cached
         ]
         
-        metadata_dfs = [parse_ena_sample_table(filename) for filename in filenames]
-        metadata_df = pd.concat(metadata_dfs, ignore_index=True)
+        if missing:
+            os.makedirs(os.path.join(folder, 'xml_files'), exist_ok=True)
+            
+            # Fetch the sample XMLs concurrently; map() keeps the sample order
+            urls = [get_ena_sample_xml_url(sample) for sample in missing]
+            with ThreadPoolExecutor(max_workers=HTTP_WORKERS) as executor:
+                filenames = list(tqdm(
+                    executor.map(partial(download_file, folder=folder), urls),
+                    desc='Getting ENA Metadata',
+                    total=len(urls),
+                    disable=NO_PROGRESS_BAR
+                ))
+            
+            fetched = time.time()
+            for sample, filename in zip(missing, filenames):
+                cached[sample] = (fetched, parse_ena_sample_table(filename))
+            if os.environ.get('ENATOOL_CACHE') == '1':
+                _write_metadata_cache(cached, cache_path)
+        
+        unique_samples = list(dict.fromkeys(samples))
+        metadata_df = pd.DataFrame.from_records(
+            [cached[sample][1] for sample in unique_samples], index=unique_samples
+        ).reindex(list(samples))
         metadata_df.index = metadata_df['IDENTIFIERS__PRIMARY_ID'].values
         
         return metadata_df
@@ -206,7 +382,11 @@ def retrieve_ena_metadata(samples: List[str], folder: str, NO_PROGRESS_BAR: bool
 
 def correct_duplicate_columns(table: pd.DataFrame) -> pd.DataFrame:
     """
-    Rename duplicate column names by appending numbers.
+    Resolve duplicate column names.
+    
+    A duplicate column holding the same values as an earlier column of the
+    same name is dropped; the remaining duplicates are renamed by appending
+    numbers (column, column_2, column_3, ...).
     
     Args:
         table: DataFrame with potentially duplicate column names
@@ -214,48 +394,66 @@ def correct_duplicate_columns(table: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with unique column names
     """
-    unique_cols, counts = np.unique(table.columns.values, return_counts=True)
-    duplicated_columns = unique_cols[counts > 1]
-    
-    def increment_generator(column: str):
-        """Generator that yields column names with incrementing suffixes."""
-        iter_num = 1
-        while True:
-            if iter_num == 1:
-                yield column
-            else:
-                yield f'{column}_{iter_num}'
-            iter_num += 1
-    
-    # Create generators for duplicated columns
-    generators = {
-        col: increment_generator(col)
-        for col in table.columns.values
-        if col in duplicated_columns
-    }
-    
-    # Apply unique names
-    table.columns = [
-        next(generators[col]) if col in generators else col
-        for col in table.columns.values
+    columns = table.columns
+    dup_mask = columns.duplicated(keep=False)
+    if not dup_mask.any():
+        return table
+    
+    # Keep every unique column and the first of each set of identical duplicates
+    keep_positions = []
+    kept_duplicates = {}
+    for position, (column, is_duplicated) in enumerate(zip(columns, dup_mask)):
+        if is_duplicated:
+            values = table.iloc[:, position]
+            kept = kept_duplicates.setdefault(column, [])
+            if any(values.equals(other) for other in kept):
+                continue
+            kept.append(values)
+        keep_positions.append(position)
+    
+    # Number the remaining duplicates in order of appearance
+    names = pd.Series(columns[keep_positions])
+    occurrence = names.groupby(names.values).cumcount()
+    new_names = [
+        name if n == 0 else f'{name}_{n + 1}'
+        for name, n in zip(names.values, occurrence.values)
     ]
+    
+    return table.iloc[:, keep_positions].set_axis(new_names, axis=1)
 
-    columns_to_remove = []
-    columns_to_rename = {}
-    for column in generators.keys():
-        final_increment = next(generators[column])
-        final_increment = int(final_increment.split('_')[-1])
-        duplicated_columns = [f'{column}_{iter_num}' 
-                              for iter_num in range(2, final_increment)]
-        for dup_column in duplicated_columns:
-            if not all(table[column].values == table[dup_column].values):
-                duplicated_columns.remove(dup_column)
-        if len(duplicated_columns) > 0:
-            columns_to_rename[f'{column}_1'] = column
-
-    table = table.drop(columns_to_remove, axis=1)
-    table = table.rename(columns=columns_to_rename)
-    return table
+
+def parse_ncbi_biosample_page(page: bytes) -> dict:
+    """
+    Parse the attribute table of an NCBI BioSample page into a flat record.
+    
+    The first table on the page holds one attribute per row (name, value).
+    A repeated attribute with a different value is kept as name_2, name_3, ...
+    
+    Args:
+        page: Raw HTML of the BioSample page
+        
+    Returns:
+        Dictionary mapping attribute names to values
+    """
+    record = {}
+    tables = html.fromstring(page).xpath('(//table)[1]')
+    if not tables:
+        return record
+    
+    for row in tables[0].iter('tr'):
+        cells = [' '.join(cell.text_content().split()) for cell in row.xpath('./th|./td')]
+        if not cells:
+            continue
+        key = cells[0]
+        value = cells[1] or None if len(cells) > 1 else None
+        
+        name, n = key, 1
+        while name in record and record[name] != value:
+            n += 1
+            name = f'{key}_{n}'
+        record[name] = value
+    
+    return record
 
 
 def get_ncbi_info(sample_accessions: List[str], NO_PROGRESS_BAR: bool) -> pd.DataFrame:
@@ -267,21 +465,27 @@ def get_ncbi_info(sample_accessions: List[str], NO_PROGRESS_BAR: bool) -> pd.Dat
         NO_PROGRESS_BAR: Disables progress bar if True
         
     Returns:
-        DataFrame with combined NCBI sample information
+        DataFrame with combined NCBI sample information, indexed by accession
     """
-    sample_info_tables = []
+    # Runs share samples; each BioSample page is requested once
+    unique_accessions = list(dict.fromkeys(sample_accessions))
+    pages = cached_get_many(
+        (get_ncbi_biosample_url(sample_accession) for sample_accession in unique_accessions),
+        max_workers=NCBI_WORKERS,
+        max_rate=NCBI_MAX_RATE
+    )
     
-    for sample_accession in tqdm(
-        sample_accessions,
-        desc='Getting NCBI Info',
-        disable=NO_PROGRESS_BAR
-    ):
-        url = get_ncbi_biosample_url(sample_accession)
-        sample_info = pd.read_html(url, index_col=0)[0].transpose()
-        sample_info.index = [sample_accession]
-        sample_info_tables.append(correct_duplicate_columns(sample_info))
+    records = [
+        parse_ncbi_biosample_page(page)
+        for page in tqdm(
+            pages,
+            desc='Getting NCBI Info',
+            total=len(unique_accessions),
+            disable=NO_PROGRESS_BAR
+        )
+    ]
     
-    return pd.concat(sample_info_tables, ignore_index=True)
+    return pd.DataFrame.from_records(records, index=unique_accessions).reindex(list(sample_accessions))
 
 
 def get_samples_info_by_ena_prj_name(
@@ -293,6 +497,10 @@ def get_samples_info_by_ena_prj_name(
     return_path: bool = False,
     cleanup_xml: bool = True,
     NO_PROGRESS_BAR: bool = False,
+    query: Optional[str] = None,
+    generate_html: bool = True,
+    samples_info: Optional[pd.DataFrame] = None,
+    create_dir: bool = True,
 ) -> Union[pd.DataFrame, str, Tuple]:
     """
     Main function to extract and compile sample information from ENA project.
@@ -305,6 +513,13 @@ def get_samples_info_by_ena_prj_name(
         return_html: Whether to return HTML string
         return_path: Whether to return path to HTML file
         cleanup_xml: Whether to automatically remove xml_files folder after extraction (default: True)
+        query: ENA search query applied on the server, e.g. 'scientific_name="Homo sapiens"'
+            (default: None, all runs of the project)
+        generate_html: Whether to save the interactive HTML table next to the CSV (default: True)
+        samples_info: Already downloaded file report rows of the project, e.g. from
+            download_projects_file (default: None, download them)
+        create_dir: Whether to create `folder` if it does not exist; pass False
+            if the caller already created it (default: True)
         
     Returns:
         Depending on flags: DataFrame, HTML string, file path, or tuple of these
@@ -315,21 +530,23 @@ def get_samples_info_by_ena_prj_name(
         >>> samples = get_samples_info_by_ena_prj_name('PRJNA335681', folder='output', cleanup_xml=False)
     """
     # Create directory if it doesn't exist
-    os.makedirs(folder, exist_ok=True)
+    if create_dir:
+        os.makedirs(folder, exist_ok=True)
 
     try:
         # Download basic sample information
-        samples_info = download_samples_file(prj_name, folder=folder)
+        if samples_info is None:
+            samples_info = download_samples_file(prj_name, folder=folder, query=query)
         samples_info = correct_duplicate_columns(samples_info)
         samples_info.index = samples_info['sample_accession'].values
         
         # Try to get detailed metadata from ENA, fall back to NCBI if needed
         samples_table = retrieve_ena_metadata(samples_info['sample_accession'].values, folder, NO_PROGRESS_BAR)
-        samples_table = correct_duplicate_columns(samples_table)
         
         if samples_table is None:
             print("ENA metadata retrieval failed, falling back to NCBI...")
             samples_table = get_ncbi_info(samples_info['sample_accession'].values, NO_PROGRESS_BAR)
+        samples_table = correct_duplicate_columns(samples_table)
         
         # Combine basic info with detailed metadata
         samples_table = pd.concat([samples_info, samples_table], axis=1)
@@ -337,19 +554,24 @@ def get_samples_info_by_ena_prj_name(
 
         # Save outputs if requested
         filepath = os.path.join(folder, prj_name)
+        # Rendered at most once, shared by the saved file and return_html
+        html_report = None
+        if (save_table and generate_html) or return_html:
+            html_report = generate_html_report(samples_table)
+        
         if save_table:
-            os.makedirs(folder, exist_ok=True)
             samples_table.to_csv(f'{filepath}.csv', index=False)
             
-            with open(f'{filepath}.html', 'w') as f:
-                f.write(generate_html_report(samples_table))
+            if generate_html:
+                with open(f'{filepath}.html', 'w') as f:
+                    f.write(html_report)
         
         # Prepare return values based on flags
         return_values = []
         if return_table:
             return_values.append(samples_table)
         if return_html:
-            return_values.append(generate_html_report(samples_table))
+            return_values.append(html_report)
         if return_path:
             return_values.append(f'{filepath}.html')
         
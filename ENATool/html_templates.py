@@ -5,6 +5,9 @@ This module contains HTML templates for generating interactive data tables
 using DataTables.js library.
 """
 
+import html
+import json
+
 import pandas as pd
 
 
@@ -25,19 +28,44 @@ def generate_html_report(table: pd.DataFrame, title: str = "ENA Sample Informati
     Returns:
         Complete HTML string
     """
-    columns_config = [f'{{data:"{col}"}}' for col in table.columns.values]
-    columns_string = '[' + ', '.join(columns_config) + ']'
+    columns_config = [
+        {'title': html.escape(str(col)), 'data': i, 'defaultContent': ''}
+        for i, col in enumerate(table.columns.values)
+    ]
     
-    # Convert table to HTML and customize
-    table_html = table.to_html(index=False).replace(
-        '<table border="1" class="dataframe">',
-        '<table id="filter_table" class="display nowrap" style="width:100%">'
-    )
+    # Rows go to DataTables as a JSON array instead of a rendered <table>;
+    # '<' is escaped so cell values cannot close the <script> block
+    data_json = _stringify_nested(table).to_json(orient='values', date_format='iso', default_handler=str)
+    columns_json = json.dumps(columns_config)
     
     return HTML_TEMPLATE_HEADER.format(
-        title=title,
-        columns=columns_string
-    ) + table_html + HTML_TEMPLATE_FOOTER
+        title=html.escape(title),
+        data=data_json.replace('<', '\\u003c'),
+        columns=columns_json.replace('<', '\\u003c')
+    ) + HTML_TABLE_STUB + HTML_TEMPLATE_FOOTER
+
+
+def _stringify_nested(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace list and dict cells with their repr, as DataFrame.to_html showed them.
+    
+    to_json would keep them as nested JSON, which DataTables renders as
+    "[object Object]". The input table is not modified.
+    """
+    nested = [
+        i for i, dtype in enumerate(table.dtypes)
+        if dtype == object
+        and table.iloc[:, i].map(lambda value: isinstance(value, (list, dict))).any()
+    ]
+    if not nested:
+        return table
+    
+    table = table.copy(deep=False)
+    for i in nested:
+        table.isetitem(i, table.iloc[:, i].map(
+            lambda value: str(value) if isinstance(value, (list, dict)) else value
+        ))
+    return table
 
 
 # HTML template header with DataTables configuration
@@ -88,7 +116,12 @@ HTML_TEMPLATE_HEADER = '''<!DOCTYPE html>
                 paging: false,
                 dom: 'BQfrtip',
                 deferRender: true,
+                data: {data},
                 columns: {columns},
+                columnDefs: [{{
+                    targets: '_all',
+                    render: $.fn.dataTable.render.text()
+                }}],
                 buttons: [
                     'copy',
                     'csv',
@@ -105,6 +138,10 @@ HTML_TEMPLATE_HEADER = '''<!DOCTYPE html>
 '''
 
 
+# Empty table filled by DataTables from the JSON data
+HTML_TABLE_STUB = '''<table id="filter_table" class="display nowrap" style="width:100%"></table>'''
+
+
 # HTML template footer
 HTML_TEMPLATE_FOOTER = '''
 </body>
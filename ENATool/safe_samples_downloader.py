@@ -6,12 +6,17 @@ Downloads FASTQ files directly from ENA FTP servers using HTTP
 """
 
 import os
+import mmap
 import pandas as pd
 import requests
 from time import sleep
 import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # import gzip
 
+from .api_urls import fetch_url
+
 # Handle tqdm for both notebook and regular environments
 try:
     _in_ipython_session = __IPYTHON__
@@ -19,6 +24,16 @@ try:
 except NameError:
     from tqdm import tqdm as tq
 
+# Number of runs downloaded at the same time; kept small to respect ENA rate limits
+DOWNLOAD_CONCURRENCY = 4
+
+# Read/write block size for streaming FASTQ files to disk (1 MiB)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Files larger than this are hashed through mmap, one window at a time
+MMAP_THRESHOLD = 64 << 20
+MMAP_WINDOW = 1 << 30
+
 class Error(Exception):
     """Base class for exceptions in this module."""
     pass
@@ -41,15 +56,51 @@ def verify_md5(filepath, expected_md5):
     if expected_md5 is None or pd.isna(expected_md5):
         return True
     
-    md5_hash = hashlib.md5()
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            md5_hash.update(chunk)
+        size = os.fstat(f.fileno()).st_size
+        if size > MMAP_THRESHOLD:
+            # Hand whole mapped windows to OpenSSL; also bounds address space on 32-bit
+            md5_hash = hashlib.md5()
+            for offset in range(0, size, MMAP_WINDOW):
+                length = min(MMAP_WINDOW, size - offset)
+                with mmap.mmap(f.fileno(), length, offset=offset, access=mmap.ACCESS_READ) as mm:
+                    md5_hash.update(mm)
+        elif hasattr(hashlib, 'file_digest'):
+            # Python 3.11+: hash the file in C
+            md5_hash = hashlib.file_digest(f, 'md5')
+        else:
+            # Read into one reusable buffer instead of allocating per chunk
+            md5_hash = hashlib.md5()
+            buffer = bytearray(DOWNLOAD_CHUNK_SIZE)
+            view = memoryview(buffer)
+            n_read = f.readinto(buffer)
+            while n_read:
+                md5_hash.update(view[:n_read])
+                n_read = f.readinto(buffer)
     
     calculated_md5 = md5_hash.hexdigest()
     return calculated_md5 == expected_md5
 
 
+def stream_to_file(chunks, destination_path):
+    """
+    Write an iterable of byte chunks to a file, hashing them on the way.
+    
+    Args:
+        chunks: Iterable of bytes, e.g. response.iter_content()
+        destination_path: Local path to save file
+    
+    Returns:
+        str: MD5 hex digest of the written data
+    """
+    md5_hash = hashlib.md5()
+    with open(destination_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as f:
+        for chunk in chunks:
+            f.write(chunk)
+            md5_hash.update(chunk)
+    return md5_hash.hexdigest()
+
+
 def download_file_from_url(url, destination_path, md5sum=None, max_retries=3, keep_failed=False):
     """
     Download a file from URL with progress bar and MD5 verification.
@@ -79,8 +130,10 @@ def download_file_from_url(url, destination_path, md5sum=None, max_retries=3, ke
         else:
             return 'Exists'
     
-    # Create directory if needed
-    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    # Create directory if needed (download_samples creates them all upfront)
+    destination_dir = os.path.dirname(destination_path)
+    if not os.path.isdir(destination_dir):
+        os.makedirs(destination_dir, exist_ok=True)
     
     # Convert FTP to HTTP (ENA supports both)
     if url.startswith('ftp://'):
@@ -93,19 +146,15 @@ def download_file_from_url(url, destination_path, md5sum=None, max_retries=3, ke
     # Try downloading with retries
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, stream=True, timeout=300)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            
-            # Download with progress bar
-            with open(destination_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                        size = f.write(chunk)
+            # Stream to disk in large blocks, computing the MD5 as data arrives
+            with fetch_url(url, stream=True, timeout=300) as response:
+                calculated_md5 = stream_to_file(
+                    response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE), destination_path
+                )
             
             # Verify MD5 if provided
             if md5sum and not pd.isna(md5sum):
-                if verify_md5(destination_path, md5sum):
+                if calculated_md5 == md5sum:
                     return 'OK'
                 else:
                     if keep_failed:
@@ -149,9 +198,9 @@ def download_and_check_data(project_id, accession, destination_paths,
     Args:
         project_id: Project identifier
         accession: Run accession (e.g., SRR3997915)
-        destination_paths: Single path (str) or list of destination file paths
-        ftp_urls: Single URL (str) or semicolon-separated URLs or list
-        md5sums: Single checksum (str) or semicolon-separated checksums or list
+        destination_paths: List of destination file paths
+        ftp_urls: List of URLs, one per destination path
+        md5sums: List of checksums, one per URL (optional)
         keep_failed (bool, optional): If True, does not remove the FASTQ files, 
             that downloaded with errors (failed md5 checksum).
             Defaults to False.
@@ -159,27 +208,9 @@ def download_and_check_data(project_id, accession, destination_paths,
     Returns:
         str or list: Download status for each file (str if 1 file, list if 2+ files)
     """
-    if ftp_urls is None or pd.isna(ftp_urls):
+    if not ftp_urls:
         return None
-    
-    # Convert strings to lists of length one if needed
-    if isinstance(ftp_urls, str):
-        if ';' in ftp_urls:
-            ftp_urls = ftp_urls.split(';')
-        else:
-            ftp_urls = [ftp_urls]
-            destination_paths = [destination_paths] if isinstance(destination_paths, str) else destination_paths
-            md5sums = [md5sums] if isinstance(md5sums, str) else [None]
-    
-    # Ensure destination_paths is a list
-    if not isinstance(destination_paths, list):
-        destination_paths = [destination_paths]
-    
-    # Parse MD5 checksums
-    if md5sums and not pd.isna(md5sums):
-        if isinstance(md5sums, str):
-            md5sums = md5sums.split(';')
-    else:
+    if not md5sums:
         md5sums = [None] * len(ftp_urls)
     
     # Download each file
@@ -195,26 +226,21 @@ def download_and_check_data(project_id, accession, destination_paths,
         return statuses
 
 
-def download_samples(project_id, ena_sample_info_table=None, downoad_info_table=None, 
-                     destination_folder=None, keep_failed=False, NO_PROGRESS_BAR=False):
+def _save_download_table(downoad_info_table, destination_folder):
+    """Save the download table next to the raw_reads folder."""
+    downoad_info_table.to_csv(
+        f'{os.path.dirname(destination_folder)}/download_info_table.csv',
+        index=False, sep='\t'
+    )
+
+
+def _prepare_download_table(project_id, ena_sample_info_table=None, downoad_info_table=None,
+                            destination_folder=None):
     """
-    Download samples using direct FTP URLs.
-    
-    Args:
-        project_id: ENA project accession (e.g., PRJNA335681)
-        ena_sample_info_table: DataFrame from get_samples_info_by_ena_prj_name
-                              Must have: 'sample_accession', 'run_accession', 'fastq_ftp', 'fastq_md5'
-        downoad_info_table: Pre-formatted download table (overrides ena_sample_info_table)
-        destination_folder: Where to save files (default: ./{project_id}/raw_reads)
-        keep_failed (bool, optional): If True, does not remove the FASTQ files, 
-            that downloaded with errors (failed md5 checksum).
-            Defaults to False.
-        NO_PROGRESS_BAR (bool, optional): If True, disables a progress bar. 
-            Defaults to False.
+    Resolve the reads folder and build the download table if needed.
     
     Returns:
-        DataFrame: Download status table with columns:
-                  ['sample_name', 'accession', 'filepath', 'ftp_urls', 'md5sums', 'download_status']
+        tuple: (download table, raw_reads destination folder)
     """
     if destination_folder is None:
         destination_folder = f"{os.getcwd()}/{project_id}/raw_reads"
@@ -222,93 +248,188 @@ def download_samples(project_id, ena_sample_info_table=None, downoad_info_table=
         destination_folder = f'{destination_folder}/raw_reads'
     
     if (downoad_info_table is None) and (ena_sample_info_table is not None):
-        # Build download table from ENA sample info
-        downoad_info_table = pd.DataFrame(
-            columns=['sample_name', 'accession', 'filepath', 'ftp_urls', 'md5sums', 'n']
-        )
-        
         required_cols = ['sample_accession', 'run_accession', 'fastq_ftp']
         if not all(col in ena_sample_info_table.columns for col in required_cols):
             raise InputError(f"ena_sample_info_table must contain columns: {required_cols}")
         
-        # Check for MD5 column
-        md5_col = 'fastq_md5' if 'fastq_md5' in ena_sample_info_table.columns else None
+        # Work on positional copies so repeated index labels cannot misalign
+        fastq_ftp = pd.Series(ena_sample_info_table['fastq_ftp'].values, dtype=object)
+        accessions = pd.Series(ena_sample_info_table['run_accession'].values, dtype=object)
+        if 'fastq_md5' in ena_sample_info_table.columns:
+            md5sums = pd.Series(ena_sample_info_table['fastq_md5'].values, dtype=object)
+        else:
+            md5sums = pd.Series(None, index=fastq_ftp.index, dtype=object)
+        has_files = fastq_ftp.notna()
         
-        for idx, row in ena_sample_info_table.iterrows():
-            name = row['sample_accession']
-            accession = row['run_accession']
-            fastq_ftp = row['fastq_ftp']
-            fastq_md5 = row[md5_col] if md5_col else None
-            
-            if pd.isna(fastq_ftp):
-                destination_file = None
-                ftp_urls = None
-                md5sums = None
-            else:
-                # Check if multiple files (paired-end)
-                if ';' in fastq_ftp:
-                    # Multiple files - keep as list
-                    links = fastq_ftp.split(';')
-                    destination_file = [
-                        f'{destination_folder}/{accession}/{link.split("/")[-1]}' 
-                        for link in links
-                    ]
-                    n = 2
-                else:
-                    # Single file - keep as string
-                    destination_file = f'{destination_folder}/{accession}/{fastq_ftp.split("/")[-1]}'
-                    n = 1
-
-                ftp_urls = fastq_ftp
-                md5sums = fastq_md5
-            
-            downoad_info_table.loc[len(downoad_info_table)] = [
-                name, accession, destination_file, ftp_urls, md5sums, n
-            ]
+        # Split links and file names for all runs at once
+        links = fastq_ftp[has_files].str.split(';')
+        n = links.str.len()
+        filenames = links.explode().str.rsplit('/', n=1).str[-1].astype(str)
+        paths = (destination_folder + '/' + accessions[has_files].astype(str).repeat(n)
+                 + '/' + filenames)
+        paths = paths.groupby(level=0).agg(list)
+        
+        # Single file - keep as string, multiple files (paired-end) - keep as list
+        filepaths = paths.where(n > 1, paths.str[0]).reindex(fastq_ftp.index)
+        filepaths = filepaths.astype(object).where(has_files, None)
+        
+        # Pass object Series so missing links stay None instead of NaN
+        downoad_info_table = pd.DataFrame({
+            'sample_name': ena_sample_info_table['sample_accession'].values,
+            'accession': accessions.values,
+            'filepath': filepaths,
+            'ftp_urls': fastq_ftp.where(has_files, None),
+            'md5sums': md5sums.where(has_files, None),
+            'n': n.reindex(fastq_ftp.index, fill_value=0).astype(int),
+        })
         
         # Save download info table
         os.makedirs(os.path.dirname(destination_folder), exist_ok=True)
-        downoad_info_table.to_csv(
-            f'{os.path.dirname(destination_folder)}/download_info_table.csv',
-            index=False, sep='\t'
-        )
+        _save_download_table(downoad_info_table, destination_folder)
     
     elif (downoad_info_table is None) and (ena_sample_info_table is None):
         raise InputError('You must provide either ena_sample_info_table or downoad_info_table')
     
-    # Download all files
-    download_status = []
-    
-    for idx, row in tq(downoad_info_table.iterrows(),
-                      desc='Downloading FASTQ files',
-                      total=len(downoad_info_table),
-                      disable=NO_PROGRESS_BAR):
-        accession = row['accession']
-        destination_path = row['filepath']
-        ftp_urls = row.get('ftp_urls', None)
-        md5sums = row.get('md5sums', None)
-        
-        if len(destination_path) == 0:
-            status = None
-        else:
-            # Pass data as-is (string for single file, list for multiple)
-            status = download_and_check_data(
-                project_id, accession, destination_path, ftp_urls, md5sums, keep_failed
+    return downoad_info_table, destination_folder
+
+
+def _split_column(downoad_info_table, column):
+    """Split a semicolon-separated column into lists, with None for missing values."""
+    if column not in downoad_info_table.columns:
+        return [None] * len(downoad_info_table)
+    values = downoad_info_table[column]
+    return values.astype(str).str.split(';').where(values.notna(), None).tolist()
+
+
+def _download_row(project_id, accession, destination_path, ftp_urls, md5sums, keep_failed):
+    """Download all files of one download table row and return its status."""
+    # Single files are stored as a plain path, paired files as a list
+    if not isinstance(destination_path, list):
+        destination_path = [destination_path]
+    return download_and_check_data(
+        project_id, accession, destination_path, ftp_urls, md5sums, keep_failed
+    )
+
+
+def _iter_download_statuses(project_id, downoad_info_table, keep_failed=False, NO_PROGRESS_BAR=False,
+                            concurrency=DOWNLOAD_CONCURRENCY):
+    """
+    Download every row of a download table using a pool of `concurrency` threads.
+    
+    Yields:
+        tuple: (row position, accession, status) in order of completion
+    """
+    # Split URLs and checksums for all rows before scheduling any download
+    ftp_urls = _split_column(downoad_info_table, 'ftp_urls')
+    md5sums = _split_column(downoad_info_table, 'md5sums')
+    
+    # Create every per-run folder once instead of once per file
+    folders = {
+        os.path.dirname(path)
+        for paths in downoad_info_table['filepath'].dropna().values
+        for path in (paths if isinstance(paths, list) else [paths])
+    }
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {}
+        for position, (accession, filepath, row_urls, row_md5sums) in enumerate(zip(
+            downoad_info_table['accession'].values,
+            downoad_info_table['filepath'].values,
+            ftp_urls,
+            md5sums
+        )):
+            future = executor.submit(
+                _download_row, project_id, accession, filepath,
+                row_urls, row_md5sums, keep_failed
             )
+            futures[future] = (position, accession)
         
-        download_status.append(status)
+        for future in tq(as_completed(futures),
+                         desc='Downloading FASTQ files',
+                         total=len(futures),
+                         disable=NO_PROGRESS_BAR):
+            position, accession = futures[future]
+            yield position, accession, future.result()
+
+
+def download_samples(project_id, ena_sample_info_table=None, downoad_info_table=None, 
+                     destination_folder=None, keep_failed=False, NO_PROGRESS_BAR=False,
+                     concurrency=DOWNLOAD_CONCURRENCY):
+    """
+    Download samples using direct FTP URLs.
     
+    Args:
+        project_id: ENA project accession (e.g., PRJNA335681)
+        ena_sample_info_table: DataFrame from get_samples_info_by_ena_prj_name
+                              Must have: 'sample_accession', 'run_accession', 'fastq_ftp', 'fastq_md5'
+        downoad_info_table: Pre-formatted download table (overrides ena_sample_info_table)
+        destination_folder: Where to save files (default: ./{project_id}/raw_reads)
+        keep_failed (bool, optional): If True, does not remove the FASTQ files, 
+            that downloaded with errors (failed md5 checksum).
+            Defaults to False.
+        NO_PROGRESS_BAR (bool, optional): If True, disables a progress bar. 
+            Defaults to False.
+        concurrency (int, optional): Number of runs downloaded in parallel.
+            Defaults to 4.
+    
+    Returns:
+        DataFrame: Download status table with columns:
+                  ['sample_name', 'accession', 'filepath', 'ftp_urls', 'md5sums', 'download_status']
+    """
+    downoad_info_table, destination_folder = _prepare_download_table(
+        project_id, ena_sample_info_table, downoad_info_table, destination_folder
+    )
+    
+    # Download all files
+    download_status = [None] * len(downoad_info_table)
+    for position, _, status in _iter_download_statuses(
+        project_id, downoad_info_table, keep_failed, NO_PROGRESS_BAR, concurrency
+    ):
+        download_status[position] = status
     downoad_info_table['download_status'] = download_status
     
     # Save final status
-    downoad_info_table.to_csv(
-        f'{os.path.dirname(destination_folder)}/download_info_table.csv',
-        index=False, sep='\t'
-    )
+    _save_download_table(downoad_info_table, destination_folder)
     
     return downoad_info_table
 
 
+def iter_download_samples(project_id, ena_sample_info_table=None, downoad_info_table=None,
+                          destination_folder=None, keep_failed=False, NO_PROGRESS_BAR=False,
+                          concurrency=DOWNLOAD_CONCURRENCY):
+    """
+    Download samples like `download_samples`, yielding each result as it completes.
+    
+    Takes the same arguments as `download_samples`. Runs are yielded in the
+    order they finish, not in table order. The download table with final
+    statuses is saved once the iterator is exhausted, but it is not
+    returned, so callers can aggregate results without keeping it.
+    
+    Yields:
+        tuple: (run accession, status) where status is 'OK', 'Exists', 'Error',
+        a list of these for paired files, or None if the run has no files
+    
+    Example:
+        >>> for accession, status in iter_download_samples('PRJNA335681', ena_sample_info_table=info):
+        ...     print(accession, status)
+    """
+    downoad_info_table, destination_folder = _prepare_download_table(
+        project_id, ena_sample_info_table, downoad_info_table, destination_folder
+    )
+    
+    download_status = [None] * len(downoad_info_table)
+    for position, accession, status in _iter_download_statuses(
+        project_id, downoad_info_table, keep_failed, NO_PROGRESS_BAR, concurrency
+    ):
+        download_status[position] = status
+        yield accession, status
+    
+    downoad_info_table['download_status'] = download_status
+    _save_download_table(downoad_info_table, destination_folder)
+
+
 def get_download_summary(download_table: pd.DataFrame) -> dict:
     """
     Get summary statistics for download results.
@@ -326,21 +447,19 @@ def get_download_summary(download_table: pd.DataFrame) -> dict:
     if 'download_status' not in download_table.columns:
         return {'error': 'No download_status column found'}
     
-    counts_table = []
+    # Paired runs hold a list of statuses, single-file runs a plain string
+    status_counts = Counter()
     for value in download_table['download_status'].values:
-        if type(value) == list:
-            counts_table.extend(value)
-        elif type(value) == str:
-            counts_table.extend([value])
-    counts_table = pd.DataFrame({'download_status':counts_table})
-    
-    status_counts = counts_table['download_status'].value_counts()
+        if isinstance(value, list):
+            status_counts.update(value)
+        elif isinstance(value, str):
+            status_counts[value] += 1
 
     return {
-        'total': download_table['n'].sum(),
-        'successful': status_counts.get('OK', 0),
-        'already_existed': status_counts.get('Exists', 0),
-        'failed': status_counts.get('Error', 0),
-        'not_attempted': download_table['download_status'].isna().sum()
+        'total': int(download_table['n'].sum()),
+        'successful': status_counts['OK'],
+        'already_existed': status_counts['Exists'],
+        'failed': status_counts['Error'],
+        'not_attempted': int(download_table['download_status'].isna().sum())
     }
 
@@ -5,17 +5,156 @@ This script demonstrates various ways to use ENATool for downloading
 and managing ENA sequencing data.
 """
 
+import os
+
+import numpy as np
+import pandas as pd
+
 import ENATool
+from ENATool.html_templates import generate_html_report
+
+PROJECT_ID = 'PRJNA335681'
+
+# Output directories of the examples, created once by main()
+EXAMPLE_DIRS = (
+    'example_project',
+    'filtered_example',
+    'batch_data',
+    'advanced_example',
+    'export_example',
+)
+
+# Fetched tables keyed by (project_id, path), shared by all examples
+_FETCH_CACHE = {}
+
+# Column formatters for the count tables printed by the examples
+_COUNT_FORMATTERS = {'pct': '{:.1f}%'.format}
+
+# Text columns with fewer distinct values than this share of rows become categoricals
+_CATEGORY_RATIO = 0.5
+
+
+def _optimize_dtypes(df):
+    """
+    Shrink a metadata table in place: downcast integers, categorize repeated text.
+    
+    Args:
+        df: Metadata table, e.g. returned by ENATool.fetch
+    
+    Returns:
+        The same DataFrame, so ena.id and ena.path are kept
+    """
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_integer_dtype(values):
+            df[column] = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            try:
+                n_unique = values.nunique()
+            except TypeError:
+                # Unhashable cells (e.g. lists of repeated XML identifiers)
+                continue
+            if len(df) and n_unique / len(df) < _CATEGORY_RATIO:
+                df[column] = values.astype('category')
+    return df
+
+
+def _to_parquet(df, filename):
+    """
+    Save a table as zstd-compressed Parquet if pyarrow is installed.
+    
+    Args:
+        df: Table to save
+        filename: Output file
+    
+    Returns:
+        True if the file was written
+    """
+    try:
+        df.to_parquet(filename, engine='pyarrow', compression='zstd', index=False)
+    except (ImportError, TypeError, ValueError):
+        # pyarrow missing (pip install ENATool[fast]) or a column it cannot store
+        return False
+    return True
+
+
+def _lists_from_arrays(df):
+    """
+    Turn list cells that Parquet read back as numpy arrays into lists again.
+    
+    Args:
+        df: Table read with pd.read_parquet
+    
+    Returns:
+        The same DataFrame, with cells equal to the table that was saved
+    """
+    for column in df.columns[df.dtypes == object]:
+        if df[column].map(lambda value: isinstance(value, np.ndarray)).any():
+            df[column] = df[column].map(
+                lambda value: value.tolist() if isinstance(value, np.ndarray) else value
+            )
+    return df
+
+
+def fetch_cached(project_id, path):
+    """
+    Fetch project metadata once per run, reusing a table saved by an earlier run.
+    
+    A Parquet copy of the table is kept next to the CSV, so later runs read
+    it instead of parsing the CSV again.
+    
+    Args:
+        project_id: ENA project accession
+        path: Project directory passed to ENATool.fetch
+    
+    Returns:
+        DataFrame with ena.id and ena.path set
+    """
+    key = (project_id, path)
+    if key not in _FETCH_CACHE:
+        csv_file = os.path.join(path, f'{project_id}.csv')
+        parquet_file = os.path.join(path, f'{project_id}.parquet')
+        if os.path.exists(parquet_file):
+            info = _lists_from_arrays(pd.read_parquet(parquet_file))
+        else:
+            if os.path.exists(csv_file):
+                info = pd.read_csv(csv_file)
+            else:
+                info = ENATool.fetch(project_id, path=path, generate_html=False, create_dir=False)
+            _to_parquet(_optimize_dtypes(info), parquet_file)
+        info.ena.id = project_id
+        info.ena.path = os.path.abspath(path)
+        _FETCH_CACHE[key] = info
+    return _FETCH_CACHE[key]
+
+
+def _print_counts(series, top=None, pct=False):
+    """
+    Print the value counts of a column as a single table.
+    
+    Args:
+        series: Column to count
+        top: Only show the `top` most frequent values
+        pct: Add the share of all rows in percent
+    """
+    counts = series.value_counts()
+    if top:
+        counts = counts.head(top)
+    table = counts.to_frame('count')
+    if pct:
+        table['pct'] = table['count'] / len(series) * 100
+    print(table.to_string(formatters=_COUNT_FORMATTERS))
 
 
-def example1_basic_metadata():
+def example1_basic_metadata(info=None):
     """Example 1: Basic metadata extraction"""
     print("=" * 60)
     print("Example 1: Basic Metadata Extraction")
     print("=" * 60)
     
     # Fetch metadata for a project
-    info = ENATool.fetch('PRJNA335681', path='example_project')
+    if info is None:
+        info = fetch_cached(PROJECT_ID, 'example_project')
     
     print(f"\n✓ Retrieved metadata for {len(info)} samples")
     print(f"✓ Columns: {len(info.columns)}")
@@ -24,35 +163,39 @@ def example1_basic_metadata():
     # Show some statistics
     if 'scientific_name' in info.columns:
         print(f"\nOrganisms found:")
-        for organism, count in info['scientific_name'].value_counts().head(3).items():
-            print(f"  • {organism}: {count} samples")
+        _print_counts(info['scientific_name'], top=3)
     
     if 'instrument_platform' in info.columns:
         print(f"\nSequencing platforms:")
-        for platform, count in info['instrument_platform'].value_counts().items():
-            print(f"  • {platform}: {count} samples")
+        _print_counts(info['instrument_platform'])
 
 
-def example2_filtered_download():
+def example2_filtered_download(info=None):
     """Example 2: Download with filtering"""
     print("\n" + "=" * 60)
     print("Example 2: Filtered Download")
     print("=" * 60)
     
-    # Get metadata
-    info = ENATool.fetch('PRJNA335681', path='example_project')
+    # Get metadata (cached, so the organisms are known without another request)
+    if info is None:
+        info = fetch_cached(PROJECT_ID, 'example_project')
     
     # Filter for specific organism (example)
     if 'scientific_name' in info.columns:
         organisms = info['scientific_name'].unique()
         if len(organisms) > 0:
             target_organism = organisms[0]
-            filtered = info[info['scientific_name'] == target_organism]
             
-            print(f"\n✓ Filtered to {len(filtered)} {target_organism} samples")
+            # The filter is applied by ENA, so only matching samples are fetched
+            filtered = ENATool.fetch(
+                PROJECT_ID,
+                path='filtered_example',
+                query=f'scientific_name="{target_organism}"',
+                generate_html=False,
+                create_dir=False
+            )
             
-            # Reinitialize ena accessor
-            filtered.ena.reinit(info)
+            print(f"\n✓ Filtered to {len(filtered)} {target_organism} samples")
             
             # Download (commented out to avoid actual download in example)
             # downloads = filtered.ena.download()
@@ -70,23 +213,29 @@ def example3_batch_processing():
     # List of projects to process
     projects = ['PRJNA335681']  # Add more project IDs as needed
     
+    # All projects are listed with a single ENA request, then split per project
     results = {}
-    for project_id in projects:
-        try:
-            info = ENATool.fetch(project_id, path=f'batch_data/{project_id}')
-            results[project_id] = {
-                'status': 'success',
-                'samples': len(info),
-                'organisms': info['scientific_name'].nunique() if 'scientific_name' in info.columns else 0
-            }
-            print(f"✓ {project_id}: {len(info)} samples")
-        except Exception as e:
-            results[project_id] = {
-                'status': 'error',
-                'error': str(e)
-            }
+    try:
+        tables = ENATool.fetch_many(projects, path='batch_data', generate_html=False)
+    except Exception as e:
+        tables = {}
+        for project_id in projects:
+            results[project_id] = {'status': 'error', 'error': str(e)}
             print(f"✗ {project_id}: {e}")
     
+    for project_id, info in tables.items():
+        results[project_id] = {
+            'status': 'success',
+            'samples': len(info),
+            'organisms': info['scientific_name'].nunique() if 'scientific_name' in info.columns else 0
+        }
+        print(f"✓ {project_id}: {len(info)} samples")
+    
+    for project_id in projects:
+        if project_id not in results:
+            results[project_id] = {'status': 'error', 'error': 'no runs found'}
+            print(f"✗ {project_id}: no runs found")
+    
     # Summary
     print(f"\nProcessed {len(projects)} projects:")
     successful = sum(1 for r in results.values() if r['status'] == 'success')
@@ -106,7 +255,9 @@ def example4_api_details():
         'PRJNA335681',
         folder='advanced_example',
         save_table=True,
-        return_table=True
+        return_table=True,
+        generate_html=False,
+        create_dir=False
     )
     
     print(f"\n✓ Retrieved {len(info)} samples using low-level API")
@@ -120,60 +271,72 @@ def example4_api_details():
     # )
 
 
-def example5_data_analysis():
+def example5_data_analysis(info=None):
     """Example 5: Metadata analysis"""
     print("\n" + "=" * 60)
     print("Example 5: Metadata Analysis")
     print("=" * 60)
     
-    # Get metadata
-    info = ENATool.fetch('PRJNA335681', path='analysis_example')
+    # Get metadata (cached, the analysis writes no files of its own)
+    if info is None:
+        info = fetch_cached(PROJECT_ID, 'example_project')
     
     print(f"\nDataset Overview:")
     print(f"  Total samples: {len(info)}")
     print(f"  Total columns: {len(info.columns)}")
     
-    # Analyze by platform
-    if 'instrument_platform' in info.columns:
-        print(f"\nBy Platform:")
-        for platform, count in info['instrument_platform'].value_counts().items():
-            print(f"  {platform}: {count} ({count/len(info)*100:.1f}%)")
-    
-    # Analyze by library strategy
-    if 'library_strategy' in info.columns:
-        print(f"\nBy Library Strategy:")
-        for strategy, count in info['library_strategy'].value_counts().head(5).items():
-            print(f"  {strategy}: {count}")
-    
-    # Check for paired-end
-    if 'library_layout' in info.columns:
-        print(f"\nLibrary Layout:")
-        for layout, count in info['library_layout'].value_counts().items():
-            print(f"  {layout}: {count}")
+    # Count platforms, library strategies and layouts in a single pass
+    columns = [c for c in ('instrument_platform', 'library_strategy', 'library_layout') if c in info.columns]
+    if columns:
+        print(f"\nBy Platform, Library Strategy and Layout:")
+        melted = info[columns].melt(var_name='field', value_name='value')
+        # Keep the fields in the order above rather than alphabetical
+        melted['field'] = pd.Categorical(melted['field'], categories=columns, ordered=True)
+        summary = melted.groupby(['field', 'value'], observed=True, sort=False).size().to_frame('count')
+        summary['pct'] = summary['count'] / summary.groupby(level='field', observed=True)['count'].transform('sum') * 100
+        summary = summary.sort_values(['field', 'count'], ascending=[True, False], kind='stable')
+        # Show only the five most common library strategies
+        rank = summary.groupby(level='field', observed=True).cumcount()
+        summary = summary[(summary.index.get_level_values('field') != 'library_strategy') | (rank < 5)]
+        print(summary.to_string(formatters=_COUNT_FORMATTERS))
 
 
-def example6_export_data():
+def example6_export_data(info=None):
     """Example 6: Export and save data"""
     print("\n" + "=" * 60)
     print("Example 6: Export Data")
     print("=" * 60)
     
     # Get metadata
-    info = ENATool.fetch('PRJNA335681', path='export_example')
+    if info is None:
+        info = fetch_cached(PROJECT_ID, 'export_example')
     
     # Export to CSV
     csv_file = 'export_example/samples.csv'
-    info.to_csv(csv_file, index=False)
+    with open(csv_file, 'w', buffering=1 << 20, newline='') as f:
+        info.to_csv(f, index=False, chunksize=10_000)
     print(f"✓ Exported to CSV: {csv_file}")
     
+    # Export to Parquet: smaller and much faster to read back than CSV
+    parquet_file = 'export_example/samples.parquet'
+    if _to_parquet(info, parquet_file):
+        print(f"✓ Exported to Parquet: {parquet_file}")
+    else:
+        print("✗ Parquet export skipped (install pyarrow: pip install ENATool[fast])")
+    
     # Export specific columns
     if 'sample_accession' in info.columns and 'scientific_name' in info.columns:
         subset = info[['sample_accession', 'scientific_name', 'library_strategy']]
         subset_file = 'export_example/samples_subset.csv'
-        subset.to_csv(subset_file, index=False)
+        with open(subset_file, 'w', buffering=1 << 20, newline='') as f:
+            subset.to_csv(f, index=False, chunksize=10_000)
         print(f"✓ Exported subset to: {subset_file}")
     
-    print(f"✓ Interactive HTML available at: export_example/PRJNA335681.html")
+    # The other examples skip the HTML table, so render it only here
+    html_file = 'export_example/samples.html'
+    with open(html_file, 'w') as f:
+        f.write(generate_html_report(info))
+    print(f"✓ Exported interactive HTML to: {html_file}")
 
 
 def main():
@@ -184,22 +347,29 @@ def main():
     print("\nThese examples demonstrate ENATool functionality.")
     print("Note: Downloads are commented out to avoid large data transfers.\n")
     
+    # Create all output directories up front; the examples fetch with create_dir=False
+    for folder in EXAMPLE_DIRS:
+        os.makedirs(folder, exist_ok=True)
+    
     try:
-        example1_basic_metadata()
-        example2_filtered_download()
+        # Fetch once and share the table between the examples
+        info = fetch_cached(PROJECT_ID, 'example_project')
+        
+        example1_basic_metadata(info)
+        example2_filtered_download(info)
         example3_batch_processing()
         example4_api_details()
-        example5_data_analysis()
-        example6_export_data()
+        example5_data_analysis(info)
+        example6_export_data(info)
         
         print("\n" + "=" * 60)
         print("All examples completed successfully!")
         print("=" * 60)
         print("\nCheck the generated directories for output files:")
         print("  • example_project/")
+        print("  • filtered_example/")
         print("  • batch_data/")
         print("  • advanced_example/")
-        print("  • analysis_example/")
         print("  • export_example/")
         
     except Exception as e:
@@ -0,0 +1,81 @@
+"""Tests for the shared HTTP helpers."""
+
+import threading
+import time
+from urllib.parse import unquote
+
+from ENATool import api_urls, extract_samples_info
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+def test_rate_limiter_spaces_out_calls_across_threads():
+    """Calls from several threads are started at most `rate` per second."""
+    limiter = api_urls._RateLimiter(20)
+    started = []
+
+    def call():
+        limiter.wait()
+        started.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(started) - min(started) >= 4 / 20 - 0.01
+
+
+def test_ncbi_info_requests_each_sample_once(monkeypatch):
+    """Runs sharing a sample request its BioSample page only once."""
+    requested = []
+
+    def fake_fetch_url(url, **kwargs):
+        requested.append(url)
+        accession = url.rsplit('/', 1)[1]
+        return _Response(
+            f'<table class="docsum"><tr><th>strain</th><td>{accession}</td></tr></table>'.encode()
+        )
+
+    monkeypatch.delenv('ENATOOL_CACHE', raising=False)
+    monkeypatch.setattr(api_urls, 'fetch_url', fake_fetch_url)
+
+    table = extract_samples_info.get_ncbi_info(['SAMN1', 'SAMN2', 'SAMN1'], True)
+
+    assert sorted(requested) == [
+        api_urls.get_ncbi_biosample_url('SAMN1'),
+        api_urls.get_ncbi_biosample_url('SAMN2'),
+    ]
+    assert list(table.index) == ['SAMN1', 'SAMN2', 'SAMN1']
+    assert table['strain'].tolist() == ['SAMN1', 'SAMN2', 'SAMN1']
+
+
+def test_cached_get_many_handles_duplicate_urls(monkeypatch, tmp_path):
+    """Threads writing the same cache entry do not clash on the temp file."""
+    def slow_fetch_url(url, **kwargs):
+        time.sleep(0.05)
+        return _Response(url.encode())
+
+    monkeypatch.setenv('ENATOOL_CACHE', '1')
+    monkeypatch.setattr(api_urls, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(api_urls, 'fetch_url', slow_fetch_url)
+
+    urls = ['https://example.org/a'] * 8
+
+    assert list(api_urls.cached_get_many(urls, max_workers=8)) == [url.encode() for url in urls]
+    assert [path.suffix for path in tmp_path.iterdir()] == ['']
+
+
+def test_projects_search_url():
+    """Each project matches by primary or secondary accession; the query applies to all."""
+    url = api_urls.get_ena_projects_search_url(['PRJNA1', 'SRP2'], query='tax_eq(9606)')
+
+    assert url.startswith('https://www.ebi.ac.uk/ena/portal/api/search?result=read_run&query=')
+    assert unquote(url.split('query=', 1)[1].split('&', 1)[0]) == (
+        '(study_accession="PRJNA1" OR secondary_study_accession="PRJNA1" OR '
+        'study_accession="SRP2" OR secondary_study_accession="SRP2") AND (tax_eq(9606))'
+    )
@@ -3,30 +3,83 @@
 Test script for ENATool CLI
 
 This script demonstrates how to test the CLI without actually
-downloading large files.
+downloading large files. Commands run inside this interpreter; pass
+--isolated to run each one in its own `python -m ENATool.cli` process.
 """
 
+import contextlib
+import io
+import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def run_command(cmd):
-    """Run a command and print output."""
-    print(f"\n{'='*60}")
-    print(f"Running: {cmd}")
-    print('='*60)
+# (title, CLI arguments) pairs, printed in this order
+COMMANDS = [
+    ("Test 1: Check version", ["--version"]),
+    ("Test 2: Show help", ["--help"]),
+    ("Test 3: Fetch command help", ["fetch", "--help"]),
+    ("Test 4: Download command help", ["download", "--help"]),
+]
+
+
+def run_cli(argv):
+    """Run the CLI in this interpreter and return (exit code, stdout, stderr)."""
+    from ENATool import cli
     
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+        try:
+            returncode = cli.main(argv)
+        except SystemExit as e:
+            returncode = e.code
+    return returncode or 0, buf.getvalue(), ''
+
+
+def run_command(cmd):
+    """Run a command in a separate interpreter and return (exit code, stdout, stderr)."""
     result = subprocess.run(
         cmd,
         shell=True,
-        capture_output=True,
-        text=True
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        bufsize=-1
     )
+    return result.returncode, result.stdout, result.stderr
+
+
+def print_result(cmd, result):
+    """Print the output of a finished command."""
+    returncode, stdout, stderr = result
+    print(f"\n{'='*60}")
+    print(f"Running: {cmd}")
+    print('='*60)
     
-    print(result.stdout)
-    if result.stderr:
-        print("STDERR:", result.stderr, file=sys.stderr)
+    print(stdout)
+    if stderr:
+        print("STDERR:", stderr, file=sys.stderr)
     
-    return result.returncode
+    return returncode
+
+
+def test_info_reads_download_table(tmp_path):
+    """`enatool info` summarizes the download table written by the downloader."""
+    for name in ('download_info_table.csv', 'downoad_info_table.csv'):
+        project = tmp_path / name.split('_')[0]
+        project.mkdir()
+        (project / 'PRJX.csv').write_text(
+            'run_accession,scientific_name\nSRR1,Homo sapiens\nSRR2,Homo sapiens\n'
+        )
+        (project / name).write_text(
+            'accession\tdownload_status\nSRR1\tOK\nSRR2\tError\n'
+        )
+        
+        returncode, stdout, _ = run_cli(['--no-banner', 'info', 'PRJX', '-p', str(project)])
+        
+        assert returncode == 0, stdout
+        assert 'Download Status:' in stdout
+        assert '• OK: 1' in stdout and '• Error: 1' in stdout
 
 
 def main():
@@ -34,21 +87,24 @@ def main():
     print("ENATool CLI Test Script")
     print("=" * 60)
     
-    # Test 1: Version
-    print("\n📌 Test 1: Check version")
-    run_command("python -m ENATool.cli --version")
-    
-    # Test 2: Help
-    print("\n📌 Test 2: Show help")
-    run_command("python -m ENATool.cli --help")
+    commands = [
+        (title, argv, ' '.join(['python -m ENATool.cli'] + argv))
+        for title, argv in COMMANDS
+    ]
     
-    # Test 3: Fetch help
-    print("\n📌 Test 3: Fetch command help")
-    run_command("python -m ENATool.cli fetch --help")
+    if '--isolated' in sys.argv[1:]:
+        # One interpreter per command, all started at once; report in order
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            futures = [executor.submit(run_command, cmd) for _, _, cmd in commands]
+            results = [future.result() for future in futures]
+    else:
+        # Import from the current directory first, like `python -m` does
+        sys.path.insert(0, os.getcwd())
+        results = [run_cli(argv) for _, argv, _ in commands]
     
-    # Test 4: Download help
-    print("\n📌 Test 4: Download command help")
-    run_command("python -m ENATool.cli download --help")
+    for (title, _, cmd), result in zip(commands, results):
+        print(f"\n📌 {title}")
+        print_result(cmd, result)
     
     print("\n" + "=" * 60)
     print("✓ CLI tests complete!")
@@ -0,0 +1,119 @@
+"""Tests for parsing ENA sample metadata."""
+
+import numpy as np
+import pandas as pd
+
+from ENATool.extract_samples_info import correct_duplicate_columns, parse_ena_sample_table
+
+
+SAMPLE_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<SAMPLE_SET>
+  <SAMPLE alias="S1" accession="ERS000001">
+    <IDENTIFIERS>
+      <PRIMARY_ID>ERS000001</PRIMARY_ID>
+      <EXTERNAL_ID namespace="BioSample">SAMEA000001</EXTERNAL_ID>
+      <EXTERNAL_ID namespace="Other">X1</EXTERNAL_ID>
+      <SUBMITTER_ID namespace="CENTER"/>
+    </IDENTIFIERS>
+    <TITLE>Liver &amp; kidney</TITLE>
+    <SAMPLE_NAME>
+      <TAXON_ID>9606</TAXON_ID>
+      <SCIENTIFIC_NAME>Homo sapiens</SCIENTIFIC_NAME>
+      <COMMON_NAME/>
+    </SAMPLE_NAME>
+    <DESCRIPTION/>
+    <SAMPLE_ATTRIBUTES>
+      {attributes}
+    </SAMPLE_ATTRIBUTES>
+  </SAMPLE>
+</SAMPLE_SET>
+'''
+
+ATTRIBUTE_XML = '<SAMPLE_ATTRIBUTE><TAG>{}</TAG><VALUE>{}</VALUE></SAMPLE_ATTRIBUTE>'
+
+
+def _parse(tmp_path, attributes):
+    path = tmp_path / 'sample.xml'
+    path.write_text(SAMPLE_XML.format(attributes=''.join(
+        ATTRIBUTE_XML.format(tag, value) for tag, value in attributes
+    )))
+    return parse_ena_sample_table(str(path))
+
+
+def test_parse_sample_xml(tmp_path):
+    """Records keep the xmltodict layout: lists, '@key'/'#text' and None for empty."""
+    record = _parse(tmp_path, [('geo loc name', 'USA')])
+
+    assert record == {
+        'IDENTIFIERS__PRIMARY_ID': 'ERS000001',
+        'IDENTIFIERS__EXTERNAL_ID': [
+            {'@namespace': 'BioSample', '#text': 'SAMEA000001'},
+            {'@namespace': 'Other', '#text': 'X1'},
+        ],
+        'IDENTIFIERS__SUBMITTER_ID__namespace': 'CENTER',
+        'SAMPLE_NAME__TAXON_ID': '9606',
+        'SAMPLE_NAME__SCIENTIFIC_NAME': 'Homo sapiens',
+        'SAMPLE_NAME__COMMON_NAME': None,
+        'TITLE': 'Liver & kidney',
+        'DESCRIPTION': None,
+        'geo_loc_name': 'USA',
+    }
+    # Column order is part of the saved CSV
+    assert list(record)[:2] == ['IDENTIFIERS__PRIMARY_ID', 'IDENTIFIERS__EXTERNAL_ID']
+    assert list(record)[-3:] == ['TITLE', 'DESCRIPTION', 'geo_loc_name']
+
+
+def test_parse_sample_attributes(tmp_path):
+    """Each attribute becomes one column; empty values become None."""
+    record = _parse(tmp_path, [('tissue', 'liver'), ('collection date', ''), ('dev stage', ' adult ')])
+
+    assert {key: record[key] for key in ('tissue', 'collection_date', 'dev_stage')} == {
+        'tissue': 'liver',
+        'collection_date': None,
+        'dev_stage': 'adult',
+    }
+
+
+def _table(columns, values):
+    """Build a table from (possibly duplicate) column names and per-column values."""
+    return pd.DataFrame(dict(enumerate(values))).set_axis(columns, axis=1)
+
+
+def test_unique_columns_are_unchanged():
+    """A table without duplicate names is returned as is."""
+    table = _table(['a', 'b'], [[1, 2], [3, 4]])
+
+    assert correct_duplicate_columns(table) is table
+
+
+def test_identical_duplicates_are_dropped():
+    """Duplicates equal to an earlier column of the same name, NaN included, are dropped."""
+    table = _table(['a', 'x', 'a'], [[1.0, np.nan], ['p', 'q'], [1.0, np.nan]])
+
+    result = correct_duplicate_columns(table)
+
+    assert list(result.columns) == ['a', 'x']
+    assert result['a'].equals(table.iloc[:, 0])
+
+
+def test_different_duplicates_are_renamed():
+    """Duplicates with different values are kept as column, column_2."""
+    table = _table(['a', 'x', 'a'], [[1, 2], ['p', 'q'], [1, 3]])
+
+    result = correct_duplicate_columns(table)
+
+    assert list(result.columns) == ['a', 'x', 'a_2']
+    assert result['a_2'].tolist() == [1, 3]
+
+
+def test_mixed_duplicates_are_numbered_contiguously():
+    """Dropping an identical duplicate leaves no gap in the numbering."""
+    table = _table(
+        ['a', 'a', 'b', 'a', 'a'],
+        [['v1'], ['v2'], ['b'], ['v1'], ['v3']]
+    )
+
+    result = correct_duplicate_columns(table)
+
+    assert list(result.columns) == ['a', 'a_2', 'b', 'a_3']
+    assert result.iloc[0].tolist() == ['v1', 'v2', 'b', 'v3']
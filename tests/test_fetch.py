@@ -0,0 +1,50 @@
+"""Tests for fetching several projects at once."""
+
+import pandas as pd
+
+import ENATool
+from ENATool import extract_samples_info
+
+
+REPORT = (
+    'study_accession\tsecondary_study_accession\trun_accession\n'
+    'PRJNA1\tSRP1\tSRR1\n'
+    'PRJNA1\tSRP1\tSRR2\n'
+    'PRJEB2\tERP2\tERR3\n'
+    'PRJEB3\tERP3\tERR4\n'
+)
+
+
+def test_fetch_many(monkeypatch, tmp_path):
+    """Runs are split per project and keyed by the accession the caller passed."""
+    requested = []
+    fetched = {}
+
+    def fake_cached_get(url, **kwargs):
+        requested.append(url)
+        return REPORT.encode()
+
+    def fake_samples_info(prj_name, folder, samples_info=None, **kwargs):
+        if prj_name == 'PRJEB3':
+            raise ValueError('BioSample unavailable')
+        fetched[prj_name] = (folder, samples_info['run_accession'].tolist())
+        return samples_info.copy()
+
+    monkeypatch.setattr(extract_samples_info, 'cached_get', fake_cached_get)
+    monkeypatch.setattr(extract_samples_info, 'get_samples_info_by_ena_prj_name', fake_samples_info)
+
+    tables = ENATool.fetch_many(['PRJNA1', 'ERP2', 'PRJEB3', 'PRJNA9'], path=str(tmp_path))
+
+    # All projects are listed with a single request
+    assert requested == [extract_samples_info.get_ena_projects_search_url(
+        ['PRJNA1', 'ERP2', 'PRJEB3', 'PRJNA9']
+    )]
+    assert fetched == {
+        'PRJNA1': (str(tmp_path / 'PRJNA1'), ['SRR1', 'SRR2']),
+        'ERP2': (str(tmp_path / 'ERP2'), ['ERR3']),
+    }
+    # Failed projects and projects without runs are left out
+    assert list(tables) == ['PRJNA1', 'ERP2']
+    assert tables['ERP2'].ena.id == 'ERP2'
+    assert tables['ERP2'].ena.path == str(tmp_path / 'ERP2')
+    assert isinstance(tables['PRJNA1'], pd.DataFrame)
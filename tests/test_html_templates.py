@@ -0,0 +1,44 @@
+"""Tests for the interactive HTML report."""
+
+import json
+import re
+
+import pandas as pd
+
+from ENATool.html_templates import generate_html_report
+
+
+def _embedded_rows(page):
+    """Return the rows passed to DataTables in a generated page."""
+    match = re.search(r'^\s*data: (.*),$', page, re.MULTILINE)
+    return json.loads(match.group(1))
+
+
+def test_nested_cells_are_embedded_as_strings():
+    """List and dict cells reach DataTables as their repr, not as nested JSON."""
+    external_ids = [
+        {'@namespace': 'BioSample', '#text': 'SAMN01'},
+        {'@namespace': 'Other', '#text': 'X1'},
+    ]
+    table = pd.DataFrame({
+        'IDENTIFIERS__EXTERNAL_ID': [external_ids, 'SAMN02'],
+        'attributes': [{'tissue': 'liver'}, None],
+        'read_count': [10, 20],
+    })
+
+    rows = _embedded_rows(generate_html_report(table))
+
+    assert rows[0] == [str(external_ids), str({'tissue': 'liver'}), 10]
+    assert rows[1] == ['SAMN02', None, 20]
+    # The caller's table is left unchanged
+    assert table.iloc[0, 0] is external_ids
+
+
+def test_script_block_cannot_be_closed_by_cell_values():
+    """'<' in cells is escaped inside the embedded JSON."""
+    table = pd.DataFrame({'title': ['</script><b>x</b>']})
+
+    page = generate_html_report(table)
+
+    assert '</script><b>' not in page
+    assert _embedded_rows(page) == [['</script><b>x</b>']]
@@ -0,0 +1,61 @@
+"""Tests for building the download table."""
+
+import pandas as pd
+
+from ENATool.safe_samples_downloader import _prepare_download_table
+
+
+FTP = 'ftp.sra.ebi.ac.uk/vol1/fastq'
+
+
+def _sample_info(rows, index):
+    return pd.DataFrame(
+        rows, columns=['sample_accession', 'run_accession', 'fastq_ftp', 'fastq_md5'], index=index
+    )
+
+
+def test_download_table_rows(tmp_path):
+    """Paired, single-file and missing runs map to one row each, in input order."""
+    info = _sample_info([
+        ['SAMEA1', 'ERR1', f'{FTP}/ERR1/ERR1_1.fastq.gz;{FTP}/ERR1/ERR1_2.fastq.gz', 'aa;bb'],
+        ['SAMEA2', 'ERR2', f'{FTP}/ERR2/ERR2.fastq.gz', 'cc'],
+        ['SAMEA3', 'ERR3', None, 'dd'],
+        ['SAMEA1', 'ERR4', f'{FTP}/ERR4/ERR4.fastq.gz', 'ee'],
+    ], index=[0, 0, 1, 0])
+
+    table, folder = _prepare_download_table('PRJX', info, destination_folder=str(tmp_path))
+
+    reads = f'{tmp_path}/raw_reads'
+    assert folder == reads
+    assert list(table.columns) == ['sample_name', 'accession', 'filepath', 'ftp_urls', 'md5sums', 'n']
+    assert table.to_dict('records') == [
+        {'sample_name': 'SAMEA1', 'accession': 'ERR1',
+         'filepath': [f'{reads}/ERR1/ERR1_1.fastq.gz', f'{reads}/ERR1/ERR1_2.fastq.gz'],
+         'ftp_urls': f'{FTP}/ERR1/ERR1_1.fastq.gz;{FTP}/ERR1/ERR1_2.fastq.gz',
+         'md5sums': 'aa;bb', 'n': 2},
+        {'sample_name': 'SAMEA2', 'accession': 'ERR2',
+         'filepath': f'{reads}/ERR2/ERR2.fastq.gz',
+         'ftp_urls': f'{FTP}/ERR2/ERR2.fastq.gz', 'md5sums': 'cc', 'n': 1},
+        {'sample_name': 'SAMEA3', 'accession': 'ERR3',
+         'filepath': None, 'ftp_urls': None, 'md5sums': None, 'n': 0},
+        {'sample_name': 'SAMEA1', 'accession': 'ERR4',
+         'filepath': f'{reads}/ERR4/ERR4.fastq.gz',
+         'ftp_urls': f'{FTP}/ERR4/ERR4.fastq.gz', 'md5sums': 'ee', 'n': 1},
+    ]
+    assert (tmp_path / 'download_info_table.csv').exists()
+
+
+def test_download_table_without_files(tmp_path):
+    """A project with no fastq links gets empty rows rather than an error."""
+    info = _sample_info([
+        ['SAMEA1', 'ERR1', None, None],
+        ['SAMEA2', 'ERR2', None, None],
+    ], index=['a', 'a']).drop(columns='fastq_md5')
+
+    table, _ = _prepare_download_table('PRJX', info, destination_folder=str(tmp_path))
+
+    assert table['accession'].tolist() == ['ERR1', 'ERR2']
+    assert table['filepath'].tolist() == [None, None]
+    assert table['ftp_urls'].tolist() == [None, None]
+    assert table['md5sums'].tolist() == [None, None]
+    assert table['n'].tolist() == [0, 0]